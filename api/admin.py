@@ -1,6 +1,15 @@
 # api/admin.py - Version complète corrigée
+from bisect import bisect_left
+
 from django.contrib import admin
+from django.core.paginator import EmptyPage, Paginator
+from django.db import connection
+from django.db.models import Avg, Count, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Concat, Substr
+from django.urls import reverse
+from django.utils.functional import cached_property
 from django.utils.html import format_html
+from django.utils.safestring import mark_safe
 from .models import (
     TypeActif, Architecture, Actif, AttributSecurite, Menace, AttributMenace,
     ControleNIST, MenaceControle, Technique, MesureDeControle, 
@@ -8,6 +17,163 @@ from .models import (
 )
 
 
+# Couleurs par niveau d'alerte
+_NIVEAU_COLORS = {
+    'FAIBLE': 'green',
+    'MOYEN': 'orange',
+    'ELEVE': 'red',
+    'CRITIQUE': 'darkred'
+}
+
+# HTML pré-rendu une fois par niveau d'alerte (simple pour les inlines, badge pour la liste)
+_NIVEAU_HTML = {
+    niveau: format_html('<span style="color: {}; font-weight: bold;">{}</span>', color, niveau)
+    for niveau, color in _NIVEAU_COLORS.items()
+}
+_NIVEAU_BADGE_HTML = {
+    niveau: format_html(
+        '<span style="color: {}; font-weight: bold; padding: 2px 6px; border-radius: 3px; background-color: {};">{}</span>',
+        'white' if niveau in ('ELEVE', 'CRITIQUE') else color,
+        color,
+        niveau
+    )
+    for niveau, color in _NIVEAU_COLORS.items()
+}
+
+# Seuils triés : niveau > seuil → couleur suivante (bisect_left)
+_RISK_THRESHOLDS = (50, 75)
+_RISK_COLORS = ('green', 'orange', 'red')
+
+_COLORED_NUMBER_TPL = '<span style="color: {}; font-weight: bold;">{:.2f}</span>'
+
+# Formatage monétaire partagé par toutes les colonnes en euros
+_fmt_money = '{:,.2f} €'.format
+
+
+def _ratio_html(attribut):
+    """Ratio risque/coût coloré selon le niveau d'alerte (annotés par with_alerte())"""
+    return _colored_number_html(_NIVEAU_COLORS[attribut.niveau_alerte], attribut.ratio_risque_cout)
+
+
+def _colored_number_html(color, value):
+    """Nombre coloré : couleur issue des constantes du module et valeur numérique,
+    il n'y a rien à échapper donc format_html (escape à chaque cellule) est évité"""
+    return mark_safe(_COLORED_NUMBER_TPL.format(color, value))
+
+
+def _risk_html(risk_level):
+    """Niveau de risque coloré (vert ≤ 50 < orange ≤ 75 < rouge)"""
+    return _colored_number_html(_RISK_COLORS[bisect_left(_RISK_THRESHOLDS, risk_level)], risk_level)
+
+
+def _is_changelist(request):
+    match = request.resolver_match
+    return match is not None and bool(match.url_name) and match.url_name.endswith('_changelist')
+
+
+def _defer_on_changelist(request, queryset, *fields):
+    """Diffère les colonnes TEXT absentes de list_display, sur la liste uniquement
+    (le formulaire de modification les lit toutes)"""
+    if _is_changelist(request):
+        return queryset.defer(*fields)
+    return queryset
+
+
+def _children_link(obj, model, fk_name, label):
+    """Lien vers la liste des enfants filtrée sur le parent, à la place d'un inline
+    qui chargerait tous les enfants sur la page de modification"""
+    if not obj.pk:
+        return '-'
+    url = reverse('admin:{}_{}_changelist'.format(model._meta.app_label, model._meta.model_name))
+    return format_html('<a href="{}?{}__exact={}">{} →</a>', url, fk_name, obj.pk, label)
+
+
+def _trigram_search_results(queryset, search_term, code_field):
+    """Recherche servie par index : nom par similarité trigramme (index GIN gin_trgm_ops),
+    code par préfixe (index varchar_pattern_ops que Django crée pour les CharField uniques).
+    Les termes icontains de search_fields combinés par OR forçaient un parcours complet."""
+    term = search_term.strip()
+    if not term:
+        return queryset, False
+    query = Q(nom__trigram_word_similar=term)
+    # Codes saisis en majuscules (AC-2) : le terme tel quel et en majuscules
+    for prefix in {term, term.upper()}:
+        query |= Q(**{code_field + '__startswith': prefix})
+    return queryset.filter(query), False
+
+
+class _EstimatedCountPaginator(Paginator):
+    """Paginateur pour les tables qui grossissent sans cesse (journaux, suivis) :
+    sans filtre, au-delà de EXACT_COUNT_LIMIT lignes, le nombre de lignes vient de
+    l'estimation PostgreSQL (pg_class.reltuples) au lieu d'un COUNT(*) qui parcourt
+    toute la table à chaque page"""
+    EXACT_COUNT_LIMIT = 10000
+    
+    # Vrai quand count est une estimation (remplacée par le nombre exact dès qu'une page
+    # demandée sort de l'estimation)
+    is_estimated = False
+    
+    @cached_property
+    def count(self):
+        query = self.object_list.query
+        if query.where:
+            return super().count
+        
+        # COUNT(*) borné (sous-requête LIMIT) : exact et bon marché pour les petites tables
+        bounded = self.object_list.order_by()[:self.EXACT_COUNT_LIMIT + 1].count()
+        if bounded <= self.EXACT_COUNT_LIMIT:
+            return bounded
+        
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT reltuples FROM pg_class WHERE relname = %s',
+                [query.model._meta.db_table]
+            )
+            row = cursor.fetchone()
+        self.is_estimated = True
+        # Jamais en dessous de ce que le COUNT borné a déjà constaté (reltuples vaut -1
+        # ou 0 tant que la table n'a pas été analysée)
+        return max(int(row[0]) if row else 0, bounded)
+    
+    def page(self, number):
+        self.count  # évalué en premier : c'est lui qui fixe is_estimated
+        if not self.is_estimated:
+            return super().page(number)
+        try:
+            page = super().page(number)
+        except EmptyPage:
+            # Au-delà de l'estimation : la page existe peut-être (estimation trop basse)
+            page = None
+        if page is None or (page.number > 1 and not page.object_list):
+            # Nombre exact puis pagination normale : une page inexistante lève EmptyPage,
+            # que l'admin traduit en redirection vers ?e=1 comme pour toute autre liste
+            self.__dict__['count'] = super().count
+            self.__dict__.pop('num_pages', None)
+            self.is_estimated = False
+            page = super().page(number)
+        return page
+
+
+class _EstimatedCountAdminMixin:
+    """Liste paginée par _EstimatedCountPaginator, nombre signalé comme approximatif"""
+    paginator = _EstimatedCountPaginator
+    show_full_result_count = False
+    change_list_template = 'admin/api/estimated_count_change_list.html'
+    
+    def changelist_view(self, request, extra_context=None):
+        response = super().changelist_view(request, extra_context)
+        cl = getattr(response, 'context_data', None) and response.context_data.get('cl')
+        if cl is not None and cl.paginator is not None:
+            # page() a pu remplacer l'estimation par le nombre exact
+            cl.result_count = cl.paginator.count
+        return response
+
+
+def _risque_financier_sum(prefix):
+    """Somme SQL de AttributMenace.risque_financier (colonne générée risque_financier_stored)"""
+    return Sum(prefix + 'risque_financier_stored')
+
+
 # ============================================================================
 # ADMIN POUR CATÉGORIE ET TYPE D'ACTIF (NOUVEAUX)
 # ============================================================================
@@ -18,9 +184,12 @@ class TypeActifInline(admin.TabularInline):
     fields = ['nom', 'code', 'description', 'actifs_count']
     readonly_fields = ['actifs_count']
     
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(_actifs_count=Count('actifs'))
+    
     def actifs_count(self, obj):
         if obj.pk:
-            return obj.actifs.count()
+            return obj._actifs_count
         return 0
     actifs_count.short_description = 'Nb Actifs'
 
@@ -37,17 +206,24 @@ class CategorieActifAdmin(admin.ModelAdmin):
         }),
     )
     
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(
+            _types_total=Count('types_actifs', distinct=True),
+            _actifs_total=Count('types_actifs__actifs', distinct=True),
+        )
+    
     def types_count(self, obj):
-        return obj.types_actifs.count()
+        return obj._types_total
     types_count.short_description = 'Nb Types'
     
     def actifs_total_count(self, obj):
-        return sum(type_actif.actifs.count() for type_actif in obj.types_actifs.all())
+        return obj._actifs_total
     actifs_total_count.short_description = 'Total Actifs'
 
 @admin.register(TypeActif)
 class TypeActifAdmin(admin.ModelAdmin):
     list_display = ['nom', 'code', 'categorie', 'actifs_count', 'created_at']
+    list_select_related = ('categorie',)
     list_filter = ['categorie']
     search_fields = ['nom', 'code', 'description', 'categorie__nom']
     ordering = ['categorie', 'nom']
@@ -61,48 +237,64 @@ class TypeActifAdmin(admin.ModelAdmin):
         }),
     )
     
+    def get_queryset(self, request):
+        # Les compteurs sont calculés en SQL (un COUNT par colonne dans la requête
+        # de la liste) au lieu d'un .count() par ligne ; ils deviennent aussi triables.
+        return super().get_queryset(request).annotate(_actifs_count=Count('actifs'))
+    
     def actifs_count(self, obj):
-        return obj.actifs.count()
+        return obj._actifs_count
     actifs_count.short_description = 'Nb Actifs'
-
-# Inline pour les actifs dans une architecture
-class ActifInline(admin.TabularInline):
-    model = Actif
-    extra = 0
-    fields = ['nom', 'type_actif', 'cout', 'criticite', 'proprietaire']
-    readonly_fields = ['nom']
+    actifs_count.admin_order_field = '_actifs_count'
 
 @admin.register(Architecture)
 class ArchitectureAdmin(admin.ModelAdmin):
     list_display = ['nom', 'risque_tolere_formatted', 'actifs_count', 'risque_financier_total_display', 'tolerance_status', 'created_at']
     search_fields = ['nom', 'description']
-    inlines = [ActifInline]
+    readonly_fields = ['actifs_link']
     ordering = ['nom']
     
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(
+            _actifs_count=Count('actifs', distinct=True),
+            _risque_total=_risque_financier_sum('actifs__attributs_securite__menaces__'),
+        )
+    
+    def actifs_link(self, obj):
+        return _children_link(obj, Actif, 'architecture', 'Gérer les actifs')
+    actifs_link.short_description = 'Actifs'
+    
     def risque_tolere_formatted(self, obj):
-        return '{:,.2f} €'.format(obj.risque_tolere)
+        return _fmt_money(obj.risque_tolere)
     risque_tolere_formatted.short_description = 'Tolérance Risque'
     
     def actifs_count(self, obj):
-        return obj.actifs.count()
+        return obj._actifs_count
     actifs_count.short_description = 'Nb Actifs'
+    actifs_count.admin_order_field = '_actifs_count'
     
     def risque_financier_total_display(self, obj):
-        total = obj.risque_financier_total
-        return '{:,.2f} €'.format(total)
+        return _fmt_money(obj._risque_total or 0)
     risque_financier_total_display.short_description = 'Risque Total'
     
     def tolerance_status(self, obj):
-        if obj.risque_depasse_tolerance:
-            return format_html(
-                '<span style="color: red; font-weight: bold;">DÉPASSÉ ({:.1f}%)</span>',
-                obj.pourcentage_tolerance_utilise
+        # Même calcul que Architecture.pourcentage_tolerance_utilise, à partir de l'annotation
+        total = float(obj._risque_total or 0)
+        tolere = float(obj.risque_tolere)
+        if tolere == 0:
+            pourcentage = 100.0 if total > 0 else 0.0
+        else:
+            pourcentage = min(100.0, (total / tolere) * 100)
+        
+        # Valeurs numériques et couleurs constantes : rien à échapper
+        if total > tolere:
+            return mark_safe(
+                '<span style="color: red; font-weight: bold;">DÉPASSÉ ({:.1f}%)</span>'.format(pourcentage)
             )
         else:
-            color = 'orange' if obj.pourcentage_tolerance_utilise > 80 else 'green'
-            return format_html(
-                '<span style="color: {}; font-weight: bold;">{:.1f}%</span>',
-                color, obj.pourcentage_tolerance_utilise
+            color = 'orange' if pourcentage > 80 else 'green'
+            return mark_safe(
+                '<span style="color: {}; font-weight: bold;">{:.1f}%</span>'.format(color, pourcentage)
             )
     tolerance_status.short_description = 'Statut Tolérance'
 
@@ -112,41 +304,20 @@ class AttributSecuriteInline(admin.TabularInline):
     fields = ['type_attribut', 'cout_compromission', 'priorite', 'niveau_alerte_display', 'ratio_display']
     readonly_fields = ['niveau_alerte_display', 'ratio_display']
     
+    def get_queryset(self, request):
+        # Risque et niveau d'alerte calculés en SQL au lieu de parcourir
+        # attribut.menaces ligne par ligne via ratio_risque_cout / niveau_alerte
+        return super().get_queryset(request).with_alerte()
+    
     def niveau_alerte_display(self, obj):
         if obj.pk:
-            niveau = obj.niveau_alerte
-            colors = {
-                'FAIBLE': 'green',
-                'MOYEN': 'orange', 
-                'ELEVE': 'red',
-                'CRITIQUE': 'darkred'
-            }
-            color = colors.get(niveau, 'black')
-            return format_html(
-                '<span style="color: {}; font-weight: bold;">{}</span>',
-                color, 
-                niveau
-            )
+            return _NIVEAU_HTML[obj.niveau_alerte]
         return "N/A"
     niveau_alerte_display.short_description = 'Alerte'
     
     def ratio_display(self, obj):
         if obj.pk:
-            ratio = obj.ratio_risque_cout
-            if ratio >= 1.0:
-                color = 'darkred'
-            elif ratio >= 0.7:
-                color = 'red'
-            elif ratio >= 0.4:
-                color = 'orange'
-            else:
-                color = 'green'
-                
-            return format_html(
-                '<span style="color: {}; font-weight: bold;">{}</span>',
-                color, 
-                '{:.2f}'.format(ratio)
-            )
+            return _ratio_html(obj)
         return "N/A"
     ratio_display.short_description = 'Ratio'
 
@@ -157,60 +328,37 @@ class ActifAdmin(admin.ModelAdmin):
         'cout_formatted', 'criticite', 'proprietaire', 
         'attributs_count', 'risque_total'
     ]
+    list_select_related = ('type_actif__categorie', 'architecture', 'proprietaire')
+    show_full_result_count = False
     list_filter = ['type_actif__categorie', 'type_actif', 'architecture', 'criticite', 'proprietaire']
     search_fields = ['nom', 'description', 'type_actif__nom', 'type_actif__categorie__nom']
     ordering = ['architecture', 'nom']
     inlines = [AttributSecuriteInline]
+    autocomplete_fields = ['type_actif', 'architecture', 'proprietaire']
+    
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(
+            _attributs_count=Count('attributs_securite', distinct=True),
+            _risque_total=_risque_financier_sum('attributs_securite__menaces__'),
+        )
     
     def type_categorie(self, obj):
         return obj.type_actif.categorie.nom
     type_categorie.short_description = 'Catégorie'
     
     def cout_formatted(self, obj):
-        return '{:,.2f} €'.format(obj.cout)
+        return _fmt_money(obj.cout)
     cout_formatted.short_description = 'Coût'
     
     def attributs_count(self, obj):
-        return obj.attributs_securite.count()
+        return obj._attributs_count
     attributs_count.short_description = 'Nb Attributs'
+    attributs_count.admin_order_field = '_attributs_count'
     
     def risque_total(self, obj):
-        total = 0
-        for attr_secu in obj.attributs_securite.all():
-            total += attr_secu.risque_financier_attribut
-        return '{:,.2f} €'.format(total)
+        return _fmt_money(obj._risque_total or 0)
     risque_total.short_description = 'Risque Total'
 
-# Inline pour les associations attribut-menace
-class AttributMenaceInline(admin.TabularInline):
-    model = AttributMenace
-    extra = 0
-    fields = ['menace', 'probabilite', 'impact', 'cout_impact', 'niveau_risque_display', 'risque_financier_display']
-    readonly_fields = ['niveau_risque_display', 'risque_financier_display']
-    
-    def niveau_risque_display(self, obj):
-        if obj.pk:
-            risk_level = obj.niveau_risque
-            if risk_level > 75:
-                color = 'red'
-            elif risk_level > 50:
-                color = 'orange'
-            else:
-                color = 'green'
-                
-            return format_html(
-                '<span style="color: {}; font-weight: bold;">{}</span>',
-                color, 
-                '{:.2f}'.format(risk_level)
-            )
-        return "N/A"
-    niveau_risque_display.short_description = 'Niveau Risque'
-    
-    def risque_financier_display(self, obj):
-        if obj.pk:
-            return '{:,.2f} €'.format(obj.risque_financier)
-        return "N/A"
-    risque_financier_display.short_description = 'Risque €'
 @admin.register(AttributSecurite)
 class AttributSecuriteAdmin(admin.ModelAdmin):
     list_display = [
@@ -218,10 +366,12 @@ class AttributSecuriteAdmin(admin.ModelAdmin):
         'risque_financier_display', 'ratio_risque_display', 'niveau_alerte_display', 
         'priorite', 'menaces_count'
     ]
+    list_select_related = ('actif__architecture',)
     list_filter = ['type_attribut', 'priorite', 'actif__architecture']
     search_fields = ['actif__nom', 'type_attribut']
     ordering = ['actif', 'type_attribut']
-    inlines = [AttributMenaceInline]
+    readonly_fields = ['menaces_link']
+    autocomplete_fields = ['actif']
     
     fieldsets = (
         ('Informations de base', {
@@ -231,64 +381,49 @@ class AttributSecuriteAdmin(admin.ModelAdmin):
             'fields': ('cout_compromission',),
             'description': 'Coût financier estimé si cet attribut était compromis'
         }),
+        ('Menaces', {
+            'fields': ('menaces_link',)
+        }),
     )
     
+    def get_queryset(self, request):
+        # Risque et niveau d'alerte par sous-requête (with_alerte()) : la jointure du
+        # COUNT ne les multiplie pas
+        return super().get_queryset(request).with_alerte().annotate(
+            _menaces_count=Count('menaces'),
+        )
+    
+    def menaces_link(self, obj):
+        return _children_link(obj, AttributMenace, 'attribut_securite', 'Gérer les menaces')
+    menaces_link.short_description = 'Menaces associées'
+    
     def cout_compromission_formatted(self, obj):
-        return '{:,.2f} €'.format(float(obj.cout_compromission))
+        return _fmt_money(obj.cout_compromission)
     cout_compromission_formatted.short_description = 'Coût Compromission'
     
     def risque_financier_display(self, obj):
-        risque = obj.risque_financier_attribut
-        return '{:,.2f} €'.format(risque)
+        return _fmt_money(obj.risque_financier_attribut)
     risque_financier_display.short_description = 'Risque Calculé'
     
     def ratio_risque_display(self, obj):
-        ratio = obj.ratio_risque_cout
-        if ratio >= 1.0:
-            color = 'darkred'
-        elif ratio >= 0.7:
-            color = 'red'
-        elif ratio >= 0.4:
-            color = 'orange'
-        else:
-            color = 'green'
-        
-        return format_html(
-            '<span style="color: {}; font-weight: bold;">{}</span>',
-            color, 
-            '{:.2f}'.format(ratio)
-        )
+        return _ratio_html(obj)
     ratio_risque_display.short_description = 'Ratio R/C'
     
     def niveau_alerte_display(self, obj):
-        niveau = obj.niveau_alerte
-        
-        colors = {
-            'FAIBLE': 'green',
-            'MOYEN': 'orange', 
-            'ELEVE': 'red',
-            'CRITIQUE': 'darkred'
-        }
-        color = colors.get(niveau, 'black')
-        text_color = 'white' if niveau in ['ELEVE', 'CRITIQUE'] else color
-        
-        return format_html(
-            '<span style="color: {}; font-weight: bold; padding: 2px 6px; border-radius: 3px; background-color: {};">{}</span>',
-            text_color,
-            color,
-            niveau
-        )
+        return _NIVEAU_BADGE_HTML[obj.niveau_alerte]
     niveau_alerte_display.short_description = 'Niveau Alerte'
     
     def menaces_count(self, obj):
-        return obj.menaces.count()
+        return obj._menaces_count
     menaces_count.short_description = 'Nb Menaces'
+    menaces_count.admin_order_field = '_menaces_count'
 
 # Inline pour les associations menace-contrôle
 class MenaceControleInline(admin.TabularInline):
     model = MenaceControle
     extra = 0
     fields = ['controle_nist', 'efficacite', 'statut_conformite', 'commentaires']
+    autocomplete_fields = ['controle_nist']
 
 @admin.register(Menace)
 class MenaceAdmin(admin.ModelAdmin):
@@ -297,18 +432,33 @@ class MenaceAdmin(admin.ModelAdmin):
     search_fields = ['nom', 'description']
     ordering = ['nom']
     inlines = [MenaceControleInline]
+    autocomplete_fields = ['attribut_securite_principal']
+    
+    def get_queryset(self, request):
+        # Deux relations multivaluées : la somme passe par une sous-requête pour ne pas
+        # être multipliée par la jointure sur controles_nist
+        impact_total = AttributMenace.objects.filter(menace=OuterRef('pk')).values('menace').annotate(
+            total=_risque_financier_sum('')
+        ).values('total')
+        qs = super().get_queryset(request).annotate(
+            _attributs_count=Count('attributs_impactes', distinct=True),
+            _controles_count=Count('controles_nist', distinct=True),
+            _impact_total=Subquery(impact_total),
+        )
+        return _defer_on_changelist(request, qs, 'description')
     
     def attributs_count(self, obj):
-        return obj.attributs_impactes.count()
+        return obj._attributs_count
     attributs_count.short_description = 'Nb Attributs'
+    attributs_count.admin_order_field = '_attributs_count'
     
     def controles_count(self, obj):
-        return obj.controles_nist.count()
+        return obj._controles_count
     controles_count.short_description = 'Nb Contrôles'
+    controles_count.admin_order_field = '_controles_count'
     
     def impact_financier_total(self, obj):
-        total = sum(attr_menace.risque_financier for attr_menace in obj.attributs_impactes.all())
-        return '{:,.2f} €'.format(total)
+        return _fmt_money(obj._impact_total or 0)
     impact_financier_total.short_description = 'Impact Financier Total'
 
 @admin.register(AttributMenace)
@@ -317,25 +467,23 @@ class AttributMenaceAdmin(admin.ModelAdmin):
         'attribut_securite', 'menace', 'probabilite', 'impact', 
         'niveau_risque_display', 'cout_impact_formatted', 'risque_financier_display'
     ]
+    list_select_related = ('attribut_securite__actif__architecture', 'menace')
+    show_full_result_count = False
     list_filter = ['menace__severite', 'attribut_securite__type_attribut', 'attribut_securite__actif__architecture']
     ordering = ['-probabilite']
+    sortable_by = ('probabilite',)
     raw_id_fields = ['attribut_securite', 'menace']
     
     def niveau_risque_display(self, obj):
-        risk_level = obj.niveau_risque
-        color = 'red' if risk_level > 75 else 'orange' if risk_level > 50 else 'green'
-        return format_html(
-            '<span style="color: {}; font-weight: bold;">{:.2f}</span>',
-            color, risk_level
-        )
+        return _risk_html(obj.niveau_risque)
     niveau_risque_display.short_description = 'Niveau Risque'
     
     def cout_impact_formatted(self, obj):
-        return '{:,.2f} €'.format(obj.cout_impact)
+        return _fmt_money(obj.cout_impact)
     cout_impact_formatted.short_description = 'Coût Impact'
     
     def risque_financier_display(self, obj):
-        return '{:,.2f} €'.format(obj.risque_financier)
+        return _fmt_money(obj.risque_financier)
     risque_financier_display.short_description = 'Risque Financier'
 
 # Inline pour les techniques dans un contrôle NIST
@@ -345,9 +493,12 @@ class TechniqueInline(admin.TabularInline):
     fields = ['nom', 'type_technique', 'complexite', 'mesures_count']
     readonly_fields = ['mesures_count']
     
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(_mesures_count=Count('mesures_controle'))
+    
     def mesures_count(self, obj):
         if obj.pk:
-            return obj.mesures_controle.count()
+            return obj._mesures_count
         return 0
     mesures_count.short_description = 'Nb Mesures'
 
@@ -355,28 +506,45 @@ class TechniqueInline(admin.TabularInline):
 class ControleNISTAdmin(admin.ModelAdmin):
     list_display = ['code', 'nom', 'famille', 'priorite', 'techniques_count', 'menaces_count', 'created_at']
     list_filter = ['famille', 'priorite']
-    search_fields = ['code', 'nom', 'description']
+    search_fields = ['code', 'nom']
     ordering = ['code']
     inlines = [TechniqueInline]
     
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(
+            _techniques_count=Count('techniques', distinct=True),
+            _menaces_count=Count('menaces_traitees', distinct=True),
+        )
+    
+    def get_search_results(self, request, queryset, search_term):
+        # Aussi utilisé par l'autocomplétion de controle_nist (MenaceControleInline)
+        return _trigram_search_results(queryset, search_term, 'code')
+    
     def techniques_count(self, obj):
-        return obj.techniques.count()
+        return obj._techniques_count
     techniques_count.short_description = 'Nb Techniques'
+    techniques_count.admin_order_field = '_techniques_count'
     
     def menaces_count(self, obj):
-        return obj.menaces_traitees.count()
+        return obj._menaces_count
     menaces_count.short_description = 'Nb Menaces'
+    menaces_count.admin_order_field = '_menaces_count'
 
 @admin.register(MenaceControle)
 class MenaceControleAdmin(admin.ModelAdmin):
     list_display = ['menace', 'controle_nist', 'efficacite', 'statut_conformite', 'techniques_count']
+    list_select_related = ('menace', 'controle_nist')
     list_filter = ['statut_conformite', 'controle_nist__famille', 'controle_nist__priorite']
     ordering = ['menace', 'controle_nist']
     raw_id_fields = ['menace', 'controle_nist']
     
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(_techniques_count=Count('controle_nist__techniques'))
+    
     def techniques_count(self, obj):
-        return obj.controle_nist.techniques.count()
+        return obj._techniques_count
     techniques_count.short_description = 'Nb Techniques'
+    techniques_count.admin_order_field = '_techniques_count'
 
 # Inline pour les mesures de contrôle dans une technique
 class MesureDeControleInline(admin.TabularInline):
@@ -389,9 +557,12 @@ class MesureDeControleInline(admin.TabularInline):
     ]
     readonly_fields = ['cout_total_3_ans_display']
     
+    def get_queryset(self, request):
+        return super().get_queryset(request).with_total_3y()
+    
     def cout_total_3_ans_display(self, obj):
         if obj.pk:
-            return '{:,.2f} €'.format(obj.cout_total_3_ans)
+            return _fmt_money(obj.cout_total_3_ans)
         return "N/A"
     cout_total_3_ans_display.short_description = 'Coût Total 3 ans'
 
@@ -399,34 +570,41 @@ class MesureDeControleInline(admin.TabularInline):
 class TechniqueAdmin(admin.ModelAdmin):
     list_display = ['nom', 'controle_nist_display', 'type_technique', 'complexite', 'mesures_count', 'cout_moyen']
     list_filter = ['type_technique', 'complexite', 'controle_nist__famille']
-    search_fields = ['nom', 'description', 'controle_nist__code', 'controle_nist__nom']
+    search_fields = ['nom', 'technique_code']
     ordering = ['controle_nist', 'nom']
     inlines = [MesureDeControleInline]
     raw_id_fields = ['controle_nist']
     
+    def get_search_results(self, request, queryset, search_term):
+        # technique_code commence par le code du contrôle (AC-2.1) : la recherche par code
+        # de contrôle reste possible sans jointure sur controle_nist
+        return _trigram_search_results(queryset, search_term, 'technique_code')
+    
+    def get_queryset(self, request):
+        qs = super().get_queryset(request).annotate(
+            _mesures_count=Count('mesures_controle'),
+            _cout_moyen=Avg('mesures_controle__cout_mise_en_oeuvre'),
+            _controle_nist_display=Concat(
+                'controle_nist__code', Value(' - '), Substr('controle_nist__nom', 1, 30), Value('...')
+            ),
+        )
+        return _defer_on_changelist(request, qs, 'description')
+    
     def controle_nist_display(self, obj):
-        return '{} - {}...'.format(obj.controle_nist.code, obj.controle_nist.nom[:30])
+        return obj._controle_nist_display
     controle_nist_display.short_description = 'Contrôle NIST'
     
     def mesures_count(self, obj):
-        return obj.mesures_controle.count()
+        return obj._mesures_count
     mesures_count.short_description = 'Nb Mesures'
+    mesures_count.admin_order_field = '_mesures_count'
     
     def cout_moyen(self, obj):
-        mesures = obj.mesures_controle.all()
-        if mesures:
-            total_cout = sum(mesure.cout_mise_en_oeuvre for mesure in mesures)
-            return '{:,.2f} €'.format(total_cout / len(mesures))
+        if obj._cout_moyen is not None:
+            return _fmt_money(obj._cout_moyen)
         return "N/A"
     cout_moyen.short_description = 'Coût Moyen'
 
-# Inline pour les implémentations dans une mesure de contrôle
-class ImplementationMesureInline(admin.TabularInline):
-    model = ImplementationMesure
-    extra = 0
-    fields = ['attribut_menace', 'statut', 'pourcentage_avancement', 'responsable', 'date_fin_prevue']
-    readonly_fields = ['attribut_menace']
-
 @admin.register(MesureDeControle)
 class MesureDeControleAdmin(admin.ModelAdmin):
     list_display = [
@@ -434,10 +612,12 @@ class MesureDeControleAdmin(admin.ModelAdmin):
         'cout_mise_en_oeuvre_formatted', 'cout_maintenance_formatted', 
         'duree_implementation', 'implementations_count'
     ]
+    # str(obj) (case à cocher des actions) lit technique.controle_nist
+    list_select_related = ('technique__controle_nist',)
     list_filter = ['nature_mesure', 'technique__type_technique', 'technique__controle_nist__famille']
     search_fields = ['nom', 'description', 'technique__nom', 'technique__controle_nist__code']
     ordering = ['technique', 'nom']
-    inlines = [ImplementationMesureInline]
+    readonly_fields = ['implementations_link']
     raw_id_fields = ['technique']
     
     fieldsets = (
@@ -450,34 +630,56 @@ class MesureDeControleAdmin(admin.ModelAdmin):
         ('Implémentation', {
             'fields': ('duree_implementation', 'ressources_necessaires')
         }),
+        ('Implémentations', {
+            'fields': ('implementations_link',)
+        }),
     )
     
+    def get_queryset(self, request):
+        qs = super().get_queryset(request).annotate(
+            _implementations_count=Count('implementations'),
+            _technique_display=Concat(
+                'technique__controle_nist__code', Value(' - '), Substr('technique__nom', 1, 30), Value('...')
+            )
+        )
+        return _defer_on_changelist(request, qs, 'description', 'ressources_necessaires')
+    
+    def implementations_link(self, obj):
+        return _children_link(obj, ImplementationMesure, 'mesure_controle', 'Gérer les implémentations')
+    implementations_link.short_description = 'Implémentations'
+    
     def technique_display(self, obj):
-        return '{} - {}...'.format(obj.technique.controle_nist.code, obj.technique.nom[:30])
+        return obj._technique_display
     technique_display.short_description = 'Technique'
     
     def cout_mise_en_oeuvre_formatted(self, obj):
-        return '{:,.2f} €'.format(obj.cout_mise_en_oeuvre)
+        return _fmt_money(obj.cout_mise_en_oeuvre)
     cout_mise_en_oeuvre_formatted.short_description = 'Coût Mise en Œuvre'
     
     def cout_maintenance_formatted(self, obj):
-        return '{:,.2f} €'.format(obj.cout_maintenance_annuel)
+        return _fmt_money(obj.cout_maintenance_annuel)
     cout_maintenance_formatted.short_description = 'Coût Maintenance/an'
     
     def implementations_count(self, obj):
-        return obj.implementations.count()
+        return obj._implementations_count
     implementations_count.short_description = 'Nb Implémentations'
+    implementations_count.admin_order_field = '_implementations_count'
 
 @admin.register(ImplementationMesure)
-class ImplementationMesureAdmin(admin.ModelAdmin):
+class ImplementationMesureAdmin(_EstimatedCountAdminMixin, admin.ModelAdmin):
     list_display = [
         'mesure_controle_display', 'attribut_menace_display', 'statut', 
         'pourcentage_avancement', 'responsable', 'date_fin_prevue', 'risque_residuel_display'
     ]
+    list_select_related = (
+        'mesure_controle', 'attribut_menace__attribut_securite__actif',
+        'attribut_menace__menace', 'responsable'
+    )
     list_filter = ['statut', 'responsable', 'mesure_controle__nature_mesure']
     date_hierarchy = 'date_fin_prevue'
     ordering = ['-created_at']
-    raw_id_fields = ['attribut_menace', 'mesure_controle', 'responsable']
+    raw_id_fields = ['attribut_menace']
+    autocomplete_fields = ['mesure_controle', 'responsable']
     
     fieldsets = (
         ('Association', {
@@ -497,6 +699,10 @@ class ImplementationMesureAdmin(admin.ModelAdmin):
         }),
     )
     
+    def get_queryset(self, request):
+        qs = super().get_queryset(request)
+        return _defer_on_changelist(request, qs, 'equipe', 'commentaires', 'obstacles')
+    
     def mesure_controle_display(self, obj):
         return '{}...'.format(obj.mesure_controle.nom[:40])
     mesure_controle_display.short_description = 'Mesure de Contrôle'
@@ -506,24 +712,35 @@ class ImplementationMesureAdmin(admin.ModelAdmin):
     attribut_menace_display.short_description = 'Risque Traité'
     
     def risque_residuel_display(self, obj):
-        risk_level = obj.risque_residuel
-        color = 'red' if risk_level > 75 else 'orange' if risk_level > 50 else 'green'
-        return format_html(
-            '<span style="color: {}; font-weight: bold;">{:.2f}</span>',
-            color, risk_level
-        )
+        return _risk_html(obj.risque_residuel)
     risque_residuel_display.short_description = 'Risque Résiduel'
 
 @admin.register(LogActivite)
-class LogActiviteAdmin(admin.ModelAdmin):
+class LogActiviteAdmin(_EstimatedCountAdminMixin, admin.ModelAdmin):
     list_display = ['utilisateur', 'action', 'objet_type', 'objet_id', 'created_at']
+    list_select_related = ('utilisateur',)
+    list_per_page = 50
+    actions = None
     list_filter = ['action', 'objet_type', 'utilisateur']
     readonly_fields = ['created_at', 'updated_at']
     date_hierarchy = 'created_at'
     ordering = ['-created_at']
+    sortable_by = ('created_at',)
+    
+    def get_queryset(self, request):
+        qs = super().get_queryset(request)
+        if _is_changelist(request):
+            # Seules les colonnes de list_display sont lues (details/adresse_ip restent en base)
+            return qs.only(
+                'utilisateur__username', 'action', 'objet_type', 'objet_id', 'created_at'
+            )
+        return qs
     
     def has_add_permission(self, request):
         return False  # Les logs ne doivent pas être créés manuellement
     
     def has_change_permission(self, request, obj=None):
-        return False  # Les logs ne doivent pas être modifiés
\ No newline at end of file
+        return False  # Les logs ne doivent pas être modifiés
+    
+    def has_delete_permission(self, request, obj=None):
+        return False  # Les logs ne doivent pas être supprimés
\ No newline at end of file
@@ -2,8 +2,34 @@
 
 from django.core.management.base import BaseCommand
 from django.db import transaction
+from django.utils import timezone
 from api.models import CategorieActif, TypeActif
 import re
+from collections import Counter
+
+# Mapping pour déterminer la catégorie selon le nom du type (la première catégorie trouvée l'emporte)
+_CATEGORY_KEYWORDS = {
+    'INFRA': ['serveur', 'server', 'srv', 'hardware', 'matériel', 'infrastructure'],
+    'APP': ['application', 'app', 'logiciel', 'software', 'programme'],
+    'DATA': ['base', 'database', 'bdd', 'stockage', 'storage', 'data', 'données'],
+    'RESEAU': ['réseau', 'network', 'routeur', 'router', 'switch', 'firewall', 'vpn'],
+    'SERVICE': ['service', 'cloud', 'saas', 'paas', 'iaas', 'api'],
+}
+
+# Classifieur compilé une seule fois : une branche par catégorie, dans l'ordre de priorité.
+# Chaque branche teste ses mots-clés par lookahead puis capture un groupe vide nommé
+# d'après la catégorie : match().lastgroup donne la première catégorie trouvée,
+# quelle que soit la position du mot-clé dans le nom
+_CATEGORY_CLASSIFIER = re.compile(
+    '|'.join(
+        '(?=.*?(?:{}))(?P<{}>)'.format('|'.join(map(re.escape, keywords)), cat_code)
+        for cat_code, keywords in _CATEGORY_KEYWORDS.items()
+    ),
+    re.DOTALL
+)
+_CLEAN_RE = re.compile(r'[^a-zA-Z0-9\s-]')
+
+UPDATE_BATCH_SIZE = 500
 
 class Command(BaseCommand):
     help = 'Migre les types d\'actifs existants vers la nouvelle structure avec catégories'
@@ -64,18 +90,22 @@ class Command(BaseCommand):
                 ]
                 
                 categories = {}
+                if not dry_run:
+                    # Une lecture pour les catégories existantes, un INSERT groupé pour les
+                    # manquantes, puis une relecture pour récupérer les instances créées
+                    codes = [cat_data['code'] for cat_data in categories_default]
+                    existantes = CategorieActif.objects.in_bulk(codes, field_name='code')
+                    CategorieActif.objects.bulk_create(
+                        [CategorieActif(**cat_data) for cat_data in categories_default
+                         if cat_data['code'] not in existantes],
+                        ignore_conflicts=True
+                    )
+                    categories = CategorieActif.objects.in_bulk(codes, field_name='code')
+                
                 for cat_data in categories_default:
                     if not dry_run:
-                        cat, created = CategorieActif.objects.get_or_create(
-                            code=cat_data['code'],
-                            defaults={
-                                'nom': cat_data['nom'],
-                                'description': cat_data['description']
-                            }
-                        )
-                        categories[cat_data['code']] = cat
-                        
-                        if created:
+                        cat = categories[cat_data['code']]
+                        if cat_data['code'] not in existantes:
                             self.stdout.write(
                                 self.style.SUCCESS(f'  ✓ Catégorie créée: {cat.nom} ({cat.code})')
                             )
@@ -95,17 +125,7 @@ class Command(BaseCommand):
                 self.stdout.write(self.style.SUCCESS('ÉTAPE 2 : Migration des types d\'actifs'))
                 self.stdout.write('='*60 + '\n')
                 
-                # Mapping pour déterminer la catégorie selon le nom du type
-                category_keywords = {
-                    'INFRA': ['serveur', 'server', 'srv', 'hardware', 'matériel', 'infrastructure'],
-                    'APP': ['application', 'app', 'logiciel', 'software', 'programme'],
-                    'DATA': ['base', 'database', 'bdd', 'stockage', 'storage', 'data', 'données'],
-                    'RESEAU': ['réseau', 'network', 'routeur', 'router', 'switch', 'firewall', 'vpn'],
-                    'SERVICE': ['service', 'cloud', 'saas', 'paas', 'iaas', 'api'],
-                }
-                
-                types_actifs = TypeActif.objects.all()
-                total_types = types_actifs.count()
+                total_types = TypeActif.objects.count()
                 
                 if total_types == 0:
                     self.stdout.write(
@@ -113,56 +133,80 @@ class Command(BaseCommand):
                     )
                 else:
                     migrated = 0
-                    code_counter = {}  # Pour gérer les codes uniques
+                    # Codes déjà pris (en base ou attribués pendant ce run), chargés en une requête :
+                    # un code généré ne peut plus entrer en conflit avec une ligne existante
+                    existing_codes = set(TypeActif.objects.exclude(code='').values_list('code', flat=True))
+                    code_counter = Counter()  # Dernier suffixe utilisé par code de base
+                    # Anciens codes remplacés dans le lot en cours : ils restent réservés jusqu'à
+                    # l'écriture du lot (code unique vérifié ligne par ligne par l'UPDATE)
+                    released_codes = []
+                    pending = 0
+                    types_to_update = []  # Écrits par lots via bulk_update
+                    now = timezone.now()
+                    # Détail par type seulement en simulation ou avec -v 2, écrit par blocs
+                    # plutôt qu'un write (et un flush) par ligne
+                    verbose = options['verbosity'] >= 2
+                    lines = []
+                    
+                    # Lecture en flux (curseur serveur) des seules colonnes utiles :
+                    # la mémoire reste bornée par chunk_size et la taille du lot d'écriture
+                    types_actifs = TypeActif.objects.only('id', 'nom', 'code', 'categorie').iterator(chunk_size=2000)
                     
                     for type_actif in types_actifs:
-                        # Déterminer la catégorie
-                        nom_lower = type_actif.nom.lower()
-                        categorie_code = 'GENERAL'  # Par défaut
-                        
-                        for cat_code, keywords in category_keywords.items():
-                            if any(keyword in nom_lower for keyword in keywords):
-                                categorie_code = cat_code
-                                break
+                        # Déterminer la catégorie (GENERAL par défaut)
+                        match = _CATEGORY_CLASSIFIER.match(type_actif.nom.lower())
+                        categorie_code = match.lastgroup if match else 'GENERAL'
                         
                         # Générer un code unique pour ce type
                         # Format: Premières lettres du nom en majuscules
                         base_code = self._generate_code(type_actif.nom)
                         
-                        # Gérer l'unicité du code
-                        if base_code not in code_counter:
-                            code_counter[base_code] = 0
-                        else:
+                        # Gérer l'unicité du code (le type peut conserver son propre code)
+                        old_code = type_actif.code
+                        code = base_code
+                        while code in existing_codes and code != old_code:
                             code_counter[base_code] += 1
-                        
-                        if code_counter[base_code] > 0:
                             code = f"{base_code}-{code_counter[base_code]}"
-                        else:
-                            code = base_code
+                        existing_codes.add(code)
+                        if old_code and old_code != code:
+                            released_codes.append(old_code)
                         
                         if not dry_run:
                             type_actif.code = code
                             type_actif.categorie = categories[categorie_code]
-                            type_actif.save()
+                            type_actif.updated_at = now  # auto_now n'est pas appliqué par bulk_update
+                            types_to_update.append(type_actif)
                             
-                            self.stdout.write(
-                                self.style.SUCCESS(
+                            if verbose:
+                                lines.append(self.style.SUCCESS(
                                     f'  ✓ {type_actif.nom}\n'
                                     f'     Code: {code}\n'
                                     f'     Catégorie: {categories[categorie_code].nom}'
-                                )
-                            )
+                                ))
                         else:
-                            self.stdout.write(
-                                self.style.WARNING(
-                                    f'  • [SIMULATION] {type_actif.nom}\n'
-                                    f'     Code: {code}\n'
-                                    f'     Catégorie: {categorie_code}'
-                                )
-                            )
+                            lines.append(self.style.WARNING(
+                                f'  • [SIMULATION] {type_actif.nom}\n'
+                                f'     Code: {code}\n'
+                                f'     Catégorie: {categorie_code}'
+                            ))
+                        
+                        if len(lines) >= UPDATE_BATCH_SIZE:
+                            self._flush_lines(lines)
+                        
+                        # Fin de lot (simulé en dry-run) : écriture, puis les anciens codes
+                        # réellement remplacés en base redeviennent disponibles
+                        pending += 1
+                        if pending >= UPDATE_BATCH_SIZE:
+                            self._flush_types(types_to_update)
+                            existing_codes.difference_update(released_codes)
+                            released_codes.clear()
+                            pending = 0
                         
                         migrated += 1
                     
+                    self._flush_types(types_to_update)
+                    self._flush_lines(lines)
+                    
                     self.stdout.write(
                         f'\n  {migrated}/{total_types} type(s) traité(s)'
                     )
@@ -206,10 +250,22 @@ class Command(BaseCommand):
                 )
                 raise
     
+    def _flush_types(self, types_to_update):
+        """Écrit le lot de types modifiés puis vide le tampon"""
+        if types_to_update:
+            TypeActif.objects.bulk_update(types_to_update, ['code', 'categorie', 'updated_at'])
+            types_to_update.clear()
+    
+    def _flush_lines(self, lines):
+        """Écrit les messages accumulés en un seul appel puis vide le tampon"""
+        if lines:
+            self.stdout.write('\n'.join(lines))
+            lines.clear()
+    
     def _generate_code(self, nom):
         """Génère un code à partir du nom"""
         # Nettoyer le nom
-        nom_clean = re.sub(r'[^a-zA-Z0-9\s-]', '', nom)
+        nom_clean = _CLEAN_RE.sub('', nom)
         
         # Prendre les premières lettres des mots
         words = nom_clean.split()
@@ -1,6 +1,33 @@
 
+from contextlib import nullcontext
+from itertools import groupby
+from operator import itemgetter
+
+from psycopg2.extras import execute_values
+
 from django.core.management.base import BaseCommand
-from api.models import Technique
+from django.db import connection, transaction
+from django.utils import timezone
+from api.models import ControleNIST, Technique
+
+UPDATE_BATCH_SIZE = 1000
+
+# updated_at est écrit explicitement : auto_now ne s'applique qu'à save()
+UPDATE_CODES_SQL = """
+    UPDATE {table} AS t
+    SET technique_code = v.technique_code, updated_at = v.updated_at
+    FROM (VALUES %s) AS v(id, technique_code, updated_at)
+    WHERE t.id = v.id
+"""
+
+# Codes de la forme "<préfixe>.<n>" : plus grand n par préfixe (PostgreSQL)
+MAX_SUFFIX_SQL = r"""
+    SELECT substring(technique_code FROM '^(.*)\.[0-9]+$'),
+           MAX(CAST(substring(technique_code FROM '\.([0-9]+)$') AS bigint))
+    FROM {table}
+    WHERE technique_code ~ '\.[0-9]+$'
+    GROUP BY 1
+"""
 
 class Command(BaseCommand):
     help = 'Génère automatiquement les codes techniques pour les enregistrements existants'
@@ -19,54 +46,65 @@ class Command(BaseCommand):
             self.stdout.write(self.style.WARNING('🔍 MODE DRY-RUN - Aucune modification ne sera sauvegardée'))
         
         techniques_updated = 0
+        to_update = []  # Tuples (id, code, updated_at) écrits par lots via UPDATE ... FROM (VALUES ...)
+        now = timezone.now()
+        # Détail par technique seulement en dry-run ou avec -v 2 ; les messages sont
+        # regroupés et écrits une fois par contrôle plutôt qu'un write par ligne
+        verbose = dry_run or options['verbosity'] >= 2
+        lines = []
         
         # Récupérer toutes les techniques sans code
-        techniques_sans_code = Technique.objects.filter(
-            technique_code__isnull=True
-        ).select_related('controle_nist').order_by('controle_nist__code', 'created_at')
+        techniques_sans_code = Technique.objects.filter(technique_code__isnull=True)
         
-        if not techniques_sans_code.exists():
+        total = techniques_sans_code.count()
+        if total == 0:
             self.stdout.write(self.style.SUCCESS('✅ Toutes les techniques ont déjà un code'))
             return
         
-        self.stdout.write(f'📋 {techniques_sans_code.count()} techniques à traiter')
+        self.stdout.write(f'📋 {total} techniques à traiter')
         
-        # Grouper par contrôle NIST pour une numérotation cohérente
-        controles_dict = {}
+        # Plus grand suffixe numérique déjà attribué par préfixe, en une requête groupée :
+        # les numéros sont réservés à partir de là, sans collision possible ni sonde par code
+        with connection.cursor() as cursor:
+            cursor.execute(MAX_SUFFIX_SQL.format(table=Technique._meta.db_table))
+            max_suffixes = dict(cursor.fetchall())
         
-        for technique in techniques_sans_code:
-            controle_code = technique.controle_nist.code
-            if controle_code not in controles_dict:
-                controles_dict[controle_code] = []
-            controles_dict[controle_code].append(technique)
+        code_by_id = dict(ControleNIST.objects.values_list('id', 'code'))
         
-        for controle_code, techniques_list in controles_dict.items():
-            self.stdout.write(f'\n📦 Traitement du contrôle {controle_code}:')
-            
-            # Trouver le prochain numéro disponible pour ce contrôle
-            techniques_existantes = Technique.objects.filter(
-                controle_nist__code=controle_code,
-                technique_code__isnull=False
-            ).count()
-            
-            next_number = techniques_existantes + 1
-            
-            for i, technique in enumerate(techniques_list):
-                # Générer le code technique
-                technique_code = f"{controle_code}.{next_number + i}"
-                
-                # Vérifier l'unicité (au cas où)
-                while Technique.objects.filter(technique_code=technique_code).exists():
-                    next_number += 1
-                    technique_code = f"{controle_code}.{next_number + i}"
+        # Une seule transaction (donc un seul commit) pour toutes les écritures
+        with transaction.atomic() if not dry_run else nullcontext():
+            # Grouper par contrôle NIST pour une numérotation cohérente : les lignes arrivent
+            # groupées par contrôle (ordre de l'index partiel technique_pending_code_idx), en flux
+            # depuis un curseur serveur (mémoire bornée), sous forme de tuples (id, nom, id contrôle)
+            # sans jointure : le code du contrôle est lu une fois par groupe dans code_by_id
+            rows = techniques_sans_code.values_list(
+                'id', 'nom', 'controle_nist_id'
+            ).order_by('controle_nist_id', 'created_at').iterator(chunk_size=2000)
+            for controle_id, techniques_list in groupby(rows, key=itemgetter(2)):
+                controle_code = code_by_id[controle_id]
+                lines.append(f'\n📦 Traitement du contrôle {controle_code}:')
                 
-                self.stdout.write(f'  ├─ {technique.nom[:50]}... → {technique_code}')
+                # Prochain numéro libre pour ce contrôle
+                next_number = max_suffixes.get(controle_code, 0) + 1
                 
-                if not dry_run:
-                    technique.technique_code = technique_code
-                    technique.save()
+                for i, (technique_id, technique_nom, _) in enumerate(techniques_list):
+                    # Générer le code technique
+                    technique_code = f"{controle_code}.{next_number + i}"
+                    
+                    if verbose:
+                        lines.append(f'  ├─ {technique_nom[:50]}... → {technique_code}')
+                    
+                    if not dry_run:
+                        to_update.append((technique_id, technique_code, now))
+                        if len(to_update) >= UPDATE_BATCH_SIZE:
+                            self._flush(to_update)
+                    
+                    techniques_updated += 1
                 
-                techniques_updated += 1
+                self.stdout.write('\n'.join(lines))
+                lines.clear()
+            
+            self._flush(to_update)
         
         if dry_run:
             self.stdout.write(f'\n🔍 {techniques_updated} techniques seraient mises à jour')
@@ -82,4 +120,18 @@ class Command(BaseCommand):
 
 
 
-                
\ No newline at end of file
+                
+    
+    def _flush(self, to_update):
+        """Écrit le lot de techniques codées en un seul UPDATE puis vide le tampon"""
+        if to_update:
+            # Les paires (id, code) sont déjà connues : un UPDATE ... FROM (VALUES ...) évite
+            # le CASE WHEN construit par bulk_update et l'instanciation des modèles
+            with connection.cursor() as cursor:
+                execute_values(
+                    cursor.cursor,
+                    UPDATE_CODES_SQL.format(table=Technique._meta.db_table),
+                    to_update,
+                    page_size=UPDATE_BATCH_SIZE
+                )
+            to_update.clear()
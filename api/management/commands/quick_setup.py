@@ -1,12 +1,14 @@
 # api/management/commands/load_realistic_data.py
 from django.core.management.base import BaseCommand
+from django.contrib.auth.hashers import make_password
 from django.contrib.auth.models import User
+from django.db import connection, transaction
 from django.utils import timezone
 from decimal import Decimal
 import random
 
 from api.models import (
-    TypeActif, Architecture, Actif, AttributSecurite, Menace, AttributMenace,
+    CategorieActif, TypeActif, Architecture, Actif, AttributSecurite, Menace, AttributMenace,
     ControleNIST, MenaceControle, Technique, MesureDeControle, ImplementationMesure
 )
 
@@ -20,12 +22,15 @@ class Command(BaseCommand):
             help='Supprime toutes les données existantes avant de charger les nouvelles',
         )
 
+    @transaction.atomic  # Un seul commit pour tout le chargement (et rien en cas d'erreur)
     def handle(self, *args, **options):
         if options['clean']:
             self.stdout.write('Suppression des données existantes...')
             self.clean_data()
 
         self.stdout.write('Chargement des données réalistes...')
+        # Messages des étapes accumulés puis écrits en un seul appel à la fin
+        self.log_lines = []
         
         # Créer les utilisateurs
         users = self.create_users()
@@ -40,26 +45,27 @@ class Command(BaseCommand):
         controles_nist = self.create_controles_nist()
         
         # Créer les techniques réalistes
-        techniques = self.create_realistic_techniques(controles_nist)
+        techniques, template_keys = self.create_realistic_techniques(controles_nist)
         
         # Créer les mesures de contrôle réalistes
-        mesures = self.create_realistic_mesures(techniques)
+        mesures = self.create_realistic_mesures(techniques, template_keys)
         
         # Créer les associations menace-contrôle
         self.create_menace_controle_associations(menaces, controles_nist)
         
         # Créer l'architecture et les actifs
-        architecture = self.create_architecture_with_actifs(types_actifs, users)
+        architecture, actifs = self.create_architecture_with_actifs(types_actifs, users)
         
         # Créer les attributs de sécurité
-        self.create_attributs_securite(architecture)
+        attributs = self.create_attributs_securite(actifs)
         
         # Créer les associations attribut-menace
-        self.create_attribut_menace_associations(architecture, menaces)
+        associations = self.create_attribut_menace_associations(attributs, menaces)
         
         # Créer les implémentations
-        self.create_implementations(users)
+        self.create_implementations(associations, users)
         
+        self._flush_lines()
         self.stdout.write(
             self.style.SUCCESS(
                 f'\nDonnées réalistes chargées avec succès!\n'
@@ -70,6 +76,12 @@ class Command(BaseCommand):
             )
         )
 
+    def _flush_lines(self):
+        """Écrit les messages accumulés en un seul appel puis vide le tampon"""
+        if self.log_lines:
+            self.stdout.write('\n'.join(self.log_lines))
+            self.log_lines.clear()
+
     def clean_data(self):
         """Supprime toutes les données existantes"""
         models_to_clean = [
@@ -78,8 +90,16 @@ class Command(BaseCommand):
             Actif, Architecture, ControleNIST, Menace, TypeActif
         ]
         
-        for model in models_to_clean:
-            model.objects.all().delete()
+        if connection.vendor == 'postgresql':
+            # TRUNCATE : vidage direct des tables, sans charger les PK ni cascader ligne par ligne
+            tables = ', '.join(
+                connection.ops.quote_name(model._meta.db_table) for model in models_to_clean
+            )
+            with connection.cursor() as cursor:
+                cursor.execute(f'TRUNCATE TABLE {tables} RESTART IDENTITY CASCADE')
+        else:
+            for model in models_to_clean:
+                model.objects.all().delete()
         
         User.objects.filter(is_superuser=False).delete()
 
@@ -91,37 +111,57 @@ class Command(BaseCommand):
             {'username': 'admin_it', 'password': 'admin123', 'first_name': 'Jean', 'last_name': 'Admin'},
         ]
         
-        users = []
+        existing = User.objects.in_bulk(
+            [data['username'] for data in users_data], field_name='username'
+        )
+        # Mots de passe hachés en mémoire : un seul INSERT pour tous les nouveaux comptes
+        new_users = []
         for data in users_data:
+            if data['username'] in existing:
+                continue
             password = data.pop('password')
-            user, created = User.objects.get_or_create(
-                username=data['username'],
-                defaults={**data, 'email': f"{data['username']}@entreprise.com", 'is_staff': True}
-            )
-            if created:
-                user.set_password(password)
-                user.save()
-                self.stdout.write(f'Utilisateur créé: {user.username}/{password}')
-            users.append(user)
-        
-        return users
+            new_users.append(User(
+                **data,
+                email=f"{data['username']}@entreprise.com",
+                is_staff=True,
+                password=make_password(password)
+            ))
+            self.log_lines.append(f"Utilisateur créé: {data['username']}/{password}")
+        User.objects.bulk_create(new_users)
+        
+        users_by_name = {**existing, **{user.username: user for user in new_users}}
+        return [users_by_name[data['username']] for data in users_data]
 
     def create_types_actifs(self):
-        """Crée les types d'actifs"""
-        types_data = [
-            'Serveur', 'Application', 'Base de Données', 'Réseau', 
-            'Poste de Travail', 'Infrastructure Cloud'
+        """Crée les types d'actifs et leurs catégories"""
+        categories_data = [
+            {'code': 'INFRA', 'nom': 'Infrastructure', 'description': 'Infrastructure matérielle et réseau'},
+            {'code': 'APP', 'nom': 'Applications', 'description': 'Applications et logiciels'},
+            {'code': 'DATA', 'nom': 'Données', 'description': 'Bases de données et stockage'},
+            {'code': 'RESEAU', 'nom': 'Réseau', 'description': 'Équipements et services réseau'},
+            {'code': 'SERVICE', 'nom': 'Services', 'description': 'Services métier et services cloud'},
         ]
+        categories = {
+            categorie.code: categorie
+            for categorie in self._get_or_create_bulk(CategorieActif, 'code', [
+                CategorieActif(**data) for data in categories_data
+            ])
+        }
         
-        types = []
-        for nom in types_data:
-            type_actif, _ = TypeActif.objects.get_or_create(
-                nom=nom,
-                defaults={'description': f'Type {nom}'}
-            )
-            types.append(type_actif)
+        # (nom, code, catégorie)
+        types_data = [
+            ('Serveur', 'SRV', 'INFRA'),
+            ('Application', 'APP', 'APP'),
+            ('Base de Données', 'BDD', 'DATA'),
+            ('Réseau', 'NET', 'RESEAU'),
+            ('Poste de Travail', 'PDT', 'INFRA'),
+            ('Infrastructure Cloud', 'CLOUD', 'SERVICE'),
+        ]
         
-        return types
+        return self._get_or_create_bulk(TypeActif, 'nom', [
+            TypeActif(nom=nom, code=code, categorie=categories[categorie_code], description=f'Type {nom}')
+            for nom, code, categorie_code in types_data
+        ])
 
     def create_menaces(self):
         """Crée le catalogue des menaces"""
@@ -134,18 +174,9 @@ class Command(BaseCommand):
             {'nom': 'Panne matérielle', 'type_menace': 'PANNE', 'severite': 'MOYEN'},
         ]
         
-        menaces = []
-        for data in menaces_data:
-            menace, _ = Menace.objects.get_or_create(
-                nom=data['nom'],
-                defaults={
-                    **data,
-                    'description': f"Description de {data['nom']}"
-                }
-            )
-            menaces.append(menace)
-        
-        return menaces
+        return self._get_or_create_bulk(Menace, 'nom', [
+            Menace(**data, description=f"Description de {data['nom']}") for data in menaces_data
+        ])
 
     def create_controles_nist(self):
         """Crée les contrôles NIST"""
@@ -158,42 +189,51 @@ class Command(BaseCommand):
             {'code': 'CP-9', 'nom': 'Information System Backup', 'famille': 'Contingency Planning', 'priorite': 'P1'},
         ]
         
-        controles = []
-        for data in controles_data:
-            controle, _ = ControleNIST.objects.get_or_create(
-                code=data['code'],
-                defaults={
-                    **data,
-                    'description': f"Description du contrôle {data['code']}"
-                }
-            )
-            controles.append(controle)
+        return self._get_or_create_bulk(ControleNIST, 'code', [
+            ControleNIST(**data, description=f"Description du contrôle {data['code']}")
+            for data in controles_data
+        ])
+
+    def _get_or_create_bulk(self, model, field, objs):
+        """get_or_create groupé sur `field` : une lecture des lignes existantes, un INSERT des absentes"""
+        keys = [getattr(obj, field) for obj in objs]
+        existing = {
+            getattr(obj, field): obj
+            for obj in model.objects.filter(**{f'{field}__in': keys})
+        }
+        missing = [obj for obj in objs if getattr(obj, field) not in existing]
+        model.objects.bulk_create(missing)
         
-        return controles
+        by_key = {**existing, **{getattr(obj, field): obj for obj in missing}}
+        return [by_key[key] for key in keys]
 
     def create_realistic_techniques(self, controles_nist):
         """Crée les techniques réalistes pour chaque contrôle NIST"""
         
-        # Mapping des techniques par contrôle NIST (basé sur les vraies pratiques)
+        # Mapping des techniques par contrôle NIST (basé sur les vraies pratiques) ;
+        # template_key désigne le modèle de mesures de create_realistic_mesures
         techniques_mapping = {
             'AC-2': [
                 {
                     'nom': 'Gestion centralisée des comptes utilisateurs',
                     'description': 'Mise en place d\'un annuaire centralisé (Active Directory) pour la gestion des comptes',
                     'type_technique': 'TECHNIQUE',
-                    'complexite': 'ELEVE'
+                    'complexite': 'ELEVE',
+                    'template_key': 'gestion_comptes'
                 },
                 {
                     'nom': 'Processus de provisioning/deprovisioning automatisé',
                     'description': 'Automatisation de la création et suppression des comptes utilisateurs',
                     'type_technique': 'ADMINISTRATIF',
-                    'complexite': 'ELEVE'
+                    'complexite': 'ELEVE',
+                    'template_key': 'formation'
                 },
                 {
                     'nom': 'Révision périodique des comptes',
                     'description': 'Processus de révision trimestrielle des comptes actifs',
                     'type_technique': 'ADMINISTRATIF',
-                    'complexite': 'MOYEN'
+                    'complexite': 'MOYEN',
+                    'template_key': 'gestion_comptes'
                 }
             ],
             'AC-3': [
@@ -201,13 +241,15 @@ class Command(BaseCommand):
                     'nom': 'Contrôle d\'accès basé sur les rôles (RBAC)',
                     'description': 'Implémentation d\'un système de rôles et permissions',
                     'type_technique': 'TECHNIQUE',
-                    'complexite': 'ELEVE'
+                    'complexite': 'ELEVE',
+                    'template_key': 'antivirus'
                 },
                 {
                     'nom': 'Contrôle d\'accès discrétionnaire (DAC)',
                     'description': 'Contrôle d\'accès basé sur la propriété des ressources',
                     'type_technique': 'TECHNIQUE',
-                    'complexite': 'MOYEN'
+                    'complexite': 'MOYEN',
+                    'template_key': 'antivirus'
                 }
             ],
             'SC-7': [
@@ -215,19 +257,22 @@ class Command(BaseCommand):
                     'nom': 'Pare-feu de périmètre',
                     'description': 'Déploiement de pare-feu pour protéger le périmètre réseau',
                     'type_technique': 'TECHNIQUE',
-                    'complexite': 'ELEVE'
+                    'complexite': 'ELEVE',
+                    'template_key': 'pare_feu'
                 },
                 {
                     'nom': 'Segmentation réseau',
                     'description': 'Division du réseau en zones de sécurité',
                     'type_technique': 'TECHNIQUE',
-                    'complexite': 'ELEVE'
+                    'complexite': 'ELEVE',
+                    'template_key': 'antivirus'
                 },
                 {
                     'nom': 'Proxy web sécurisé',
                     'description': 'Filtrage et contrôle du trafic web sortant',
                     'type_technique': 'TECHNIQUE',
-                    'complexite': 'MOYEN'
+                    'complexite': 'MOYEN',
+                    'template_key': 'antivirus'
                 }
             ],
             'SI-3': [
@@ -235,19 +280,22 @@ class Command(BaseCommand):
                     'nom': 'Solution antivirus centralisée',
                     'description': 'Déploiement d\'une solution antivirus gérée centralement',
                     'type_technique': 'TECHNIQUE',
-                    'complexite': 'MOYEN'
+                    'complexite': 'MOYEN',
+                    'template_key': 'antivirus'
                 },
                 {
                     'nom': 'Protection anti-malware en temps réel',
                     'description': 'Détection et blocage en temps réel des malwares',
                     'type_technique': 'TECHNIQUE',
-                    'complexite': 'ELEVE'
+                    'complexite': 'ELEVE',
+                    'template_key': 'antivirus'
                 },
                 {
                     'nom': 'Sandboxing des fichiers suspects',
                     'description': 'Analyse des fichiers suspects dans un environnement isolé',
                     'type_technique': 'TECHNIQUE',
-                    'complexite': 'ELEVE'
+                    'complexite': 'ELEVE',
+                    'template_key': 'antivirus'
                 }
             ],
             'SI-4': [
@@ -255,19 +303,22 @@ class Command(BaseCommand):
                     'nom': 'SIEM (Security Information and Event Management)',
                     'description': 'Collecte et corrélation des événements de sécurité',
                     'type_technique': 'TECHNIQUE',
-                    'complexite': 'ELEVE'
+                    'complexite': 'ELEVE',
+                    'template_key': 'monitoring'
                 },
                 {
                     'nom': 'IDS/IPS réseau',
                     'description': 'Système de détection/prévention d\'intrusion réseau',
                     'type_technique': 'TECHNIQUE',
-                    'complexite': 'ELEVE'
+                    'complexite': 'ELEVE',
+                    'template_key': 'antivirus'
                 },
                 {
                     'nom': 'Monitoring des logs système',
                     'description': 'Surveillance continue des journaux système',
                     'type_technique': 'DETECTIF',
-                    'complexite': 'MOYEN'
+                    'complexite': 'MOYEN',
+                    'template_key': 'monitoring'
                 }
             ],
             'CP-9': [
@@ -275,41 +326,41 @@ class Command(BaseCommand):
                     'nom': 'Sauvegarde automatisée quotidienne',
                     'description': 'Système de sauvegarde automatique des données critiques',
                     'type_technique': 'TECHNIQUE',
-                    'complexite': 'MOYEN'
+                    'complexite': 'MOYEN',
+                    'template_key': 'sauvegarde'
                 },
                 {
                     'nom': 'Sauvegarde vers site distant',
                     'description': 'Réplication des sauvegardes vers un site distant',
                     'type_technique': 'TECHNIQUE',
-                    'complexite': 'ELEVE'
+                    'complexite': 'ELEVE',
+                    'template_key': 'sauvegarde'
                 },
                 {
                     'nom': 'Tests de restauration périodiques',
                     'description': 'Vérification mensuelle de l\'intégrité des sauvegardes',
                     'type_technique': 'CORRECTIF',
-                    'complexite': 'MOYEN'
+                    'complexite': 'MOYEN',
+                    'template_key': 'antivirus'
                 }
             ]
         }
         
+        # Un seul INSERT multi-lignes au lieu d'un create() par technique ;
+        # template_key n'est pas un champ du modèle, il est renvoyé à part
         techniques = []
+        template_keys = []
         for controle in controles_nist:
-            techniques_list = techniques_mapping.get(controle.code, [])
-            
-            for technique_data in techniques_list:
-                technique = Technique.objects.create(
-                    controle_nist=controle,
-                    nom=technique_data['nom'],
-                    description=technique_data['description'],
-                    type_technique=technique_data['type_technique'],
-                    complexite=technique_data['complexite']
-                )
-                techniques.append(technique)
-        
-        self.stdout.write(f'{len(techniques)} techniques réalistes créées')
-        return techniques
+            for technique_data in techniques_mapping.get(controle.code, []):
+                technique_data = dict(technique_data)
+                template_keys.append(technique_data.pop('template_key'))
+                techniques.append(Technique(controle_nist=controle, **technique_data))
+        techniques = Technique.objects.bulk_create(techniques, batch_size=1000)
+        
+        self.log_lines.append(f'{len(techniques)} techniques réalistes créées')
+        return techniques, template_keys
 
-    def create_realistic_mesures(self, techniques):
+    def create_realistic_mesures(self, techniques, template_keys):
         """Crée les mesures de contrôle réalistes pour chaque technique"""
         
         # Mapping des mesures par type de technique
@@ -448,24 +499,10 @@ class Command(BaseCommand):
             ]
         }
         
-        mesures = []
-        for technique in techniques:
-            # Déterminer le type de mesures selon la technique
-            if 'compte' in technique.nom.lower() or 'utilisateur' in technique.nom.lower():
-                mesures_type = mesures_templates['gestion_comptes']
-            elif 'pare-feu' in technique.nom.lower() or 'firewall' in technique.nom.lower():
-                mesures_type = mesures_templates['pare_feu']
-            elif 'antivirus' in technique.nom.lower() or 'malware' in technique.nom.lower():
-                mesures_type = mesures_templates['antivirus']
-            elif 'monitoring' in technique.nom.lower() or 'siem' in technique.nom.lower():
-                mesures_type = mesures_templates['monitoring']
-            elif 'sauvegarde' in technique.nom.lower() or 'backup' in technique.nom.lower():
-                mesures_type = mesures_templates['sauvegarde']
-            elif technique.type_technique == 'ADMINISTRATIF':
-                mesures_type = mesures_templates['formation']
-            else:
-                # Mesures génériques
-                mesures_type = mesures_templates['antivirus']  # Par défaut
+        mesures = []  # Insérées en une fois par bulk_create après la boucle
+        for technique, template_key in zip(techniques, template_keys):
+            # Type de mesures fixé dans techniques_mapping : simple accès au dict
+            mesures_type = mesures_templates[template_key]
             
             # Prendre 1-2 mesures par technique
             nb_mesures = min(random.randint(1, 2), len(mesures_type))
@@ -475,20 +512,20 @@ class Command(BaseCommand):
                 # Variation de coût ±10%
                 variation = random.uniform(0.9, 1.1)
                 
-                mesure = MesureDeControle.objects.create(
+                mesures.append(MesureDeControle(
                     technique=technique,
                     nom=mesure_template['nom'],
                     description=mesure_template['description'],
                     nature_mesure=mesure_template['nature_mesure'],
-                    cout_mise_en_oeuvre=Decimal(str(int(mesure_template['cout_mise_en_oeuvre'] * variation))),
-                    cout_maintenance_annuel=Decimal(str(int(mesure_template['cout_maintenance_annuel'] * variation))),
-                    efficacite=Decimal(str(mesure_template['efficacite'] + random.uniform(-3, 3))),
+                    cout_mise_en_oeuvre=int(mesure_template['cout_mise_en_oeuvre'] * variation),
+                    cout_maintenance_annuel=int(mesure_template['cout_maintenance_annuel'] * variation),
+                    efficacite=Decimal(f"{mesure_template['efficacite'] + random.uniform(-3, 3):.2f}"),
                     duree_implementation=mesure_template['duree_implementation'] + random.randint(-5, 10),
                     ressources_necessaires=mesure_template['ressources_necessaires']
-                )
-                mesures.append(mesure)
+                ))
         
-        self.stdout.write(f'{len(mesures)} mesures réalistes créées')
+        mesures = MesureDeControle.objects.bulk_create(mesures, batch_size=500)
+        self.log_lines.append(f'{len(mesures)} mesures réalistes créées')
         return mesures
 
     def create_menace_controle_associations(self, menaces, controles_nist):
@@ -502,25 +539,31 @@ class Command(BaseCommand):
             ('Panne matérielle', ['CP-9', 'SI-4']),
         ]
         
+        menaces_by_nom = {m.nom: m for m in menaces}
+        controles_by_code = {c.code: c for c in controles_nist}
+        
+        menace_controles = []
         for menace_nom, controles_codes in associations:
-            menace = next((m for m in menaces if m.nom == menace_nom), None)
+            menace = menaces_by_nom.get(menace_nom)
             if not menace:
                 continue
             
             for code in controles_codes:
-                controle = next((c for c in controles_nist if c.code == code), None)
+                controle = controles_by_code.get(code)
                 if not controle:
                     continue
                 
-                MenaceControle.objects.get_or_create(
+                menace_controles.append(MenaceControle(
                     menace=menace,
                     controle_nist=controle,
-                    defaults={
-                        'efficacite': Decimal(str(random.uniform(75, 95))),
-                        'statut_conformite': random.choice(['NON_CONFORME', 'PARTIELLEMENT', 'CONFORME']),
-                        'commentaires': f'Association {menace.nom} - {controle.code}'
-                    }
-                )
+                    efficacite=Decimal(f'{random.uniform(75, 95):.2f}'),
+                    statut_conformite=random.choice(['NON_CONFORME', 'PARTIELLEMENT', 'CONFORME']),
+                    commentaires=f'Association {menace.nom} - {controle.code}'
+                ))
+        
+        # Un seul INSERT ; les paires déjà présentes (unique_together) sont ignorées
+        # comme le faisait get_or_create
+        MenaceControle.objects.bulk_create(menace_controles, ignore_conflicts=True)
 
     def create_architecture_with_actifs(self, types_actifs, users):
         """Crée l'architecture avec des actifs"""
@@ -538,80 +581,93 @@ class Command(BaseCommand):
             {'nom': 'Postes Utilisateurs', 'type': 'Poste de Travail', 'cout': 25000, 'criticite': 'MOYEN'},
         ]
         
-        for data in actifs_data:
-            type_actif = next(t for t in types_actifs if t.nom == data['type'])
-            Actif.objects.create(
+        types_by_nom = {t.nom: t for t in types_actifs}
+        actifs = [
+            Actif(
                 nom=data['nom'],
                 description=f"Description de {data['nom']}",
-                cout=Decimal(str(data['cout'])),
-                type_actif=type_actif,
+                cout=data['cout'],
+                type_actif=types_by_nom[data['type']],
                 architecture=architecture,
                 proprietaire=random.choice(users),
                 criticite=data['criticite']
             )
+            for data in actifs_data
+        ]
+        Actif.objects.bulk_create(actifs, batch_size=500)
         
-        return architecture
+        return architecture, actifs
 
-    def create_attributs_securite(self, architecture):
-        """Crée les attributs de sécurité"""
-        for actif in architecture.actifs.all():
+    def create_attributs_securite(self, actifs):
+        """Crée les attributs de sécurité des actifs créés juste avant"""
+        attributs = []  # Insérés en une fois par bulk_create
+        for actif in actifs:
             for type_attribut in ['CONFIDENTIALITE', 'INTEGRITE', 'DISPONIBILITE']:
                 if actif.criticite == 'CRITIQUE':
-                    valeur_cible = random.uniform(95, 99)
-                    valeur_actuelle = random.uniform(80, 94)
+                    cout_compromission = random.uniform(200000, 500000)
                     priorite = 'P1'
                 elif actif.criticite == 'ELEVE':
-                    valeur_cible = random.uniform(85, 95)
-                    valeur_actuelle = random.uniform(70, 84)
+                    cout_compromission = random.uniform(100000, 250000)
                     priorite = 'P2'
                 else:
-                    valeur_cible = random.uniform(75, 90)
-                    valeur_actuelle = random.uniform(60, 80)
+                    cout_compromission = random.uniform(20000, 100000)
                     priorite = 'P2'
                 
-                AttributSecurite.objects.create(
+                attributs.append(AttributSecurite(
                     actif=actif,
                     type_attribut=type_attribut,
-                    valeur_cible=Decimal(str(round(valeur_cible, 2))),
-                    valeur_actuelle=Decimal(str(round(valeur_actuelle, 2))),
+                    cout_compromission=Decimal(f'{cout_compromission:.2f}'),
                     priorite=priorite
-                )
+                ))
+        
+        return AttributSecurite.objects.bulk_create(attributs, batch_size=1000)
 
-    def create_attribut_menace_associations(self, architecture, menaces):
+    def create_attribut_menace_associations(self, attributs, menaces):
         """Crée les associations attribut-menace"""
-        for actif in architecture.actifs.all():
-            for attribut in actif.attributs_securite.all():
-                # 2-3 menaces par attribut
-                selected_menaces = random.sample(menaces, min(3, len(menaces)))
+        associations = []  # Insérées en une fois par bulk_create
+        for attribut in attributs:
+            # 2-3 menaces par attribut
+            selected_menaces = random.sample(menaces, min(3, len(menaces)))
+            
+            for menace in selected_menaces:
+                if menace.severite == 'CRITIQUE':
+                    probabilite = random.uniform(15, 40)
+                    impact = random.uniform(80, 95)
+                    cout_impact = random.uniform(100000, 300000)
+                elif menace.severite == 'ELEVE':
+                    probabilite = random.uniform(25, 60)
+                    impact = random.uniform(60, 85)
+                    cout_impact = random.uniform(50000, 150000)
+                else:
+                    probabilite = random.uniform(35, 70)
+                    impact = random.uniform(40, 70)
+                    cout_impact = random.uniform(10000, 60000)
                 
-                for menace in selected_menaces:
-                    if menace.severite == 'CRITIQUE':
-                        probabilite = random.uniform(15, 40)
-                        impact = random.uniform(80, 95)
-                        cout_impact = random.uniform(100000, 300000)
-                    elif menace.severite == 'ELEVE':
-                        probabilite = random.uniform(25, 60)
-                        impact = random.uniform(60, 85)
-                        cout_impact = random.uniform(50000, 150000)
-                    else:
-                        probabilite = random.uniform(35, 70)
-                        impact = random.uniform(40, 70)
-                        cout_impact = random.uniform(10000, 60000)
-                    
-                    AttributMenace.objects.create(
-                        attribut_securite=attribut,
-                        menace=menace,
-                        probabilite=Decimal(str(round(probabilite, 2))),
-                        impact=Decimal(str(round(impact, 2))),
-                        cout_impact=Decimal(str(round(cout_impact, 2)))
-                    )
+                associations.append(AttributMenace(
+                    attribut_securite=attribut,
+                    menace=menace,
+                    probabilite=Decimal(f'{probabilite:.2f}'),
+                    impact=Decimal(f'{impact:.2f}'),
+                    cout_impact=Decimal(f'{cout_impact:.2f}')
+                ))
+        
+        return AttributMenace.objects.bulk_create(associations, batch_size=1000)
 
-    def create_implementations(self, users):
-        """Crée les implémentations"""
-        attribut_menaces = list(AttributMenace.objects.all())
+    def create_implementations(self, associations, users):
+        """Crée les implémentations pour les associations créées par ce chargement"""
+        # Associations de ce chargement uniquement : une relance ne peut pas retomber sur
+        # une paire (association, mesure) déjà implémentée.
+        # Chaîne menace → contrôles → techniques → mesures préchargée : les .all() de la
+        # boucle lisent le cache au lieu d'une requête par niveau et par association
+        attribut_menaces = AttributMenace.objects.filter(
+            pk__in=[association.pk for association in associations[:10]]
+        ).select_related('menace').prefetch_related(
+            'menace__controles_nist__controle_nist__techniques__mesures_controle'
+        )
         mesures = list(MesureDeControle.objects.all())
+        implementations = []  # Insérées en une fois par bulk_create
         
-        for i, attr_menace in enumerate(attribut_menaces[:10]):
+        for i, attr_menace in enumerate(attribut_menaces):
             # Trouver une mesure appropriée
             mesures_appropriees = []
             for menace_controle in attr_menace.menace.controles_nist.all():
@@ -623,11 +679,13 @@ class Command(BaseCommand):
             
             mesure = random.choice(mesures_appropriees)
             
-            ImplementationMesure.objects.create(
+            implementations.append(ImplementationMesure(
                 attribut_menace=attr_menace,
                 mesure_controle=mesure,
                 statut=random.choice(['PLANIFIE', 'EN_COURS', 'IMPLEMENTE']),
                 responsable=random.choice(users),
-                pourcentage_avancement=Decimal(str(random.uniform(0, 100))),
+                pourcentage_avancement=Decimal(f'{random.uniform(0, 100):.2f}'),
                 commentaires=f'Implémentation réaliste #{i+1}'
-            )
\ No newline at end of file
+            ))
+        
+        ImplementationMesure.objects.bulk_create(implementations)
\ No newline at end of file
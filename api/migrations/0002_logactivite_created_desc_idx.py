@@ -0,0 +1,20 @@
+# Generated by Django 5.2.5 on 2026-10-16 09:12
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY ne peut pas s'exécuter dans une transaction
+    atomic = False
+
+    dependencies = [
+        ('api', '0001_initial'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='logactivite',
+            index=models.Index(fields=['-created_at'], name='log_act_created_desc_idx'),
+        ),
+    ]
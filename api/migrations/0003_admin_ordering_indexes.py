@@ -0,0 +1,40 @@
+# Generated by Django 5.2.5 on 2026-10-16 10:03
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY ne peut pas s'exécuter dans une transaction
+    atomic = False
+
+    dependencies = [
+        ('api', '0002_logactivite_created_desc_idx'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='actif',
+            index=models.Index(fields=['architecture', 'nom'], name='actif_arch_nom_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='attributmenace',
+            index=models.Index(fields=['-probabilite'], name='attr_menace_proba_desc_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='technique',
+            index=models.Index(fields=['controle_nist', 'nom'], name='technique_ctrl_nom_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='mesuredecontrole',
+            index=models.Index(fields=['technique', 'nom'], name='mesure_tech_nom_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='implementationmesure',
+            index=models.Index(fields=['-created_at'], name='impl_mesure_created_desc_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='implementationmesure',
+            index=models.Index(fields=['date_fin_prevue'], name='impl_mesure_date_fin_idx'),
+        ),
+    ]
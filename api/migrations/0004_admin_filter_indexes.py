@@ -0,0 +1,28 @@
+# Generated by Django 5.2.5 on 2026-10-16 11:20
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY ne peut pas s'exécuter dans une transaction
+    atomic = False
+
+    dependencies = [
+        ('api', '0003_admin_ordering_indexes'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='implementationmesure',
+            index=models.Index(fields=['statut', '-created_at'], name='impl_mesure_statut_created_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='logactivite',
+            index=models.Index(fields=['action', '-created_at'], name='log_act_action_created_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='logactivite',
+            index=models.Index(fields=['objet_type', '-created_at'], name='log_act_objtype_created_idx'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.5 on 2026-10-16 11:45
+
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import AddIndexConcurrently, TrigramExtension
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY ne peut pas s'exécuter dans une transaction
+    atomic = False
+
+    dependencies = [
+        ('api', '0004_admin_filter_indexes'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        AddIndexConcurrently(
+            model_name='controlenist',
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=['nom'], name='controle_nist_nom_trgm_idx', opclasses=['gin_trgm_ops']
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name='technique',
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=['nom'], name='technique_nom_trgm_idx', opclasses=['gin_trgm_ops']
+            ),
+        ),
+    ]
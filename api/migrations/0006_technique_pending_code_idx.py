@@ -0,0 +1,24 @@
+# Generated by Django 5.2.5 on 2026-10-16 12:10
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY ne peut pas s'exécuter dans une transaction
+    atomic = False
+
+    dependencies = [
+        ('api', '0005_search_trigram_indexes'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='technique',
+            index=models.Index(
+                condition=models.Q(technique_code__isnull=True),
+                fields=['controle_nist', 'created_at'],
+                name='technique_pending_code_idx',
+            ),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.5 on 2026-10-16 13:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0006_technique_pending_code_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='attributmenace',
+            name='risque_financier_stored',
+            field=models.GeneratedField(
+                db_persist=True,
+                expression=models.F('probabilite') * models.F('cout_impact') / 100,
+                output_field=models.DecimalField(decimal_places=6, max_digits=20),
+            ),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.5 on 2026-10-16 13:41
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY ne peut pas s'exécuter dans une transaction
+    atomic = False
+
+    dependencies = [
+        ('api', '0007_attributmenace_risque_financier_stored'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='attributmenace',
+            index=models.Index(
+                fields=['attribut_securite'],
+                include=['risque_financier_stored'],
+                name='attr_menace_secu_rf_idx',
+            ),
+        ),
+    ]
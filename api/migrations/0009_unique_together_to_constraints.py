@@ -0,0 +1,47 @@
+# Generated by Django 5.2.5 on 2026-10-16 14:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0008_attribut_menace_rf_covering_idx'),
+    ]
+
+    # Contraintes nommées créées avant la suppression des unique_together :
+    # l'unicité reste garantie pendant toute la migration
+    operations = [
+        migrations.AddConstraint(
+            model_name='attributsecurite',
+            constraint=models.UniqueConstraint(fields=('actif', 'type_attribut'), name='uq_attr_secu_actif_type'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='attributsecurite',
+            unique_together=set(),
+        ),
+        migrations.AddConstraint(
+            model_name='attributmenace',
+            constraint=models.UniqueConstraint(fields=('attribut_securite', 'menace'), name='uq_attr_menace_attr_menace'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='attributmenace',
+            unique_together=set(),
+        ),
+        migrations.AddConstraint(
+            model_name='menacecontrole',
+            constraint=models.UniqueConstraint(fields=('menace', 'controle_nist'), name='uq_menace_ctrl_menace_ctrl'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='menacecontrole',
+            unique_together=set(),
+        ),
+        migrations.AddConstraint(
+            model_name='implementationmesure',
+            constraint=models.UniqueConstraint(fields=('attribut_menace', 'mesure_controle'), name='uq_impl_mesure_attr_mesure'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='implementationmesure',
+            unique_together=set(),
+        ),
+    ]
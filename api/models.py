@@ -1,7 +1,10 @@
 # api/models.py
 from django.db import models
+from django.db.models.functions import Coalesce
 from django.contrib.auth.models import User
+from django.contrib.postgres.indexes import GinIndex
 from django.core.validators import MinValueValidator, MaxValueValidator
+from django.utils.functional import cached_property
 from decimal import Decimal
 import uuid
 
@@ -11,8 +14,16 @@ class BaseModel(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    # Propriétés calculées (cached_property) à invalider après chaque sauvegarde
+    cached_properties = ()
+    
     class Meta:
         abstract = True
+    
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        for name in self.cached_properties:
+            self.__dict__.pop(name, None)
 
 # ============================================================================
 # HIÉRARCHIE: CATÉGORIE → TYPE D'ACTIF → ACTIF
@@ -88,22 +99,24 @@ class Architecture(BaseModel):
     def __str__(self):
         return self.nom
     
-    @property
+    cached_properties = ('risque_financier_total', 'risque_depasse_tolerance', 'pourcentage_tolerance_utilise')
+    
+    @cached_property
     def risque_financier_total(self):
         """Calcule le risque financier total de l'architecture"""
-        total_risque_financier = 0
-        for actif in self.actifs.all():
-            for attr_secu in actif.attributs_securite.all():
-                for menace_link in attr_secu.menaces.all():
-                    total_risque_financier += menace_link.risque_financier
-        return float(total_risque_financier)
-    
-    @property
+        # Une seule requête agrégée sur la colonne générée au lieu du parcours
+        # actifs → attributs → menaces ligne par ligne
+        total = AttributMenace.objects.filter(
+            attribut_securite__actif__architecture_id=self.id
+        ).aggregate(total=models.Sum('risque_financier_stored'))['total']
+        return float(total or 0)
+    
+    @cached_property
     def risque_depasse_tolerance(self):
         """Vérifie si le risque financier total dépasse la tolérance"""
         return self.risque_financier_total > float(self.risque_tolere)
     
-    @property
+    @cached_property
     def pourcentage_tolerance_utilise(self):
         """Calcule le pourcentage de tolérance au risque utilisée"""
         if float(self.risque_tolere) == 0:
@@ -133,10 +146,43 @@ class Actif(BaseModel):
         db_table = 'actif'
         verbose_name = 'Actif'
         verbose_name_plural = 'Actifs'
+        indexes = [
+            models.Index(fields=['architecture', 'nom'], name='actif_arch_nom_idx'),
+        ]
     
     def __str__(self):
         return f"{self.nom} ({self.architecture.nom})"
 
+# Ratio risque/coût → niveau d'alerte, du seuil le plus haut au plus bas : partagés par
+# AttributSecurite.niveau_alerte (Python) et AttributSecuriteQuerySet.with_alerte() (SQL)
+SEUILS_ALERTE = ((1.0, 'CRITIQUE'), (0.7, 'ELEVE'), (0.4, 'MOYEN'))
+NIVEAU_ALERTE_MIN = 'FAIBLE'
+
+class AttributSecuriteQuerySet(models.QuerySet):
+    def with_alerte(self):
+        """Annote risque financier et niveau d'alerte calculés par la base (lus par les propriétés)"""
+        risque = AttributMenace.objects.filter(
+            attribut_securite=models.OuterRef('pk')
+        ).values('attribut_securite').annotate(
+            total=models.Sum('risque_financier_stored')
+        ).values('total')
+        return self.annotate(
+            _risque_financier=Coalesce(models.Subquery(risque), models.Value(Decimal('0')))
+        ).alias(
+            _ratio=models.Case(
+                models.When(cout_compromission=0, then=models.Value(Decimal('0'))),
+                default=models.F('_risque_financier') / models.F('cout_compromission')
+            )
+        ).annotate(
+            _niveau_alerte=models.Case(
+                *[
+                    models.When(_ratio__gte=Decimal(str(seuil)), then=models.Value(niveau))
+                    for seuil, niveau in SEUILS_ALERTE
+                ],
+                default=models.Value(NIVEAU_ALERTE_MIN)
+            )
+        )
+
 class AttributSecurite(BaseModel):
     """Attributs de sécurité d'un actif (CIA Triad + autres)"""
     actif = models.ForeignKey(Actif, on_delete=models.CASCADE, related_name='attributs_securite')
@@ -169,43 +215,103 @@ class AttributSecurite(BaseModel):
         default='P2'
     )
     
-    @property
+    objects = AttributSecuriteQuerySet.as_manager()
+    
+    # Les annotations de with_alerte() sont aussi retirées : elles seraient périmées après save()
+    cached_properties = (
+        'risque_financier_attribut', 'ratio_risque_cout', 'niveau_alerte',
+        '_risque_financier', '_niveau_alerte'
+    )
+    
+    @cached_property
     def risque_financier_attribut(self):
         """Calcule le risque financier total pour cet attribut basé sur ses menaces"""
+        total = self.__dict__.get('_risque_financier')
+        if total is not None:
+            return float(total)
+        
         total_risque = 0
         for menace_link in self.menaces.all():
             total_risque += menace_link.risque_financier
         return float(total_risque)
     
-    @property
+    @cached_property
     def ratio_risque_cout(self):
         """Ratio entre le risque calculé et le coût de compromission défini"""
         if float(self.cout_compromission) == 0:
             return 0.0
         return self.risque_financier_attribut / float(self.cout_compromission)
     
-    @property
+    @cached_property
     def niveau_alerte(self):
         """Niveau d'alerte basé sur le ratio risque/coût"""
+        niveau = self.__dict__.get('_niveau_alerte')
+        if niveau is not None:
+            return niveau
+        
         ratio = self.ratio_risque_cout
-        if ratio >= 1.0:
-            return 'CRITIQUE'
-        elif ratio >= 0.7:
-            return 'ELEVE'
-        elif ratio >= 0.4:
-            return 'MOYEN'
-        else:
-            return 'FAIBLE'
+        for seuil, niveau in SEUILS_ALERTE:
+            if ratio >= seuil:
+                return niveau
+        return NIVEAU_ALERTE_MIN
     
     class Meta:
         db_table = 'attribut_securite'
         verbose_name = 'Attribut de sécurité'
         verbose_name_plural = 'Attributs de sécurité'
-        unique_together = ['actif', 'type_attribut']
+        constraints = [
+            models.UniqueConstraint(fields=['actif', 'type_attribut'], name='uq_attr_secu_actif_type'),
+        ]
     
     def __str__(self):
         return f"{self.actif.nom} - {self.type_attribut}"
 
+class MenaceQuerySet(models.QuerySet):
+    def with_context(self):
+        """Précharge le contexte : les chaînes de FK (un seul objet par niveau) en JOIN via
+        select_related, la relation inverse attributs_impactes en une requête via Prefetch"""
+        return self.select_related(
+            'attribut_securite_principal__actif__architecture'
+        ).prefetch_related(
+            models.Prefetch(
+                'attributs_impactes',
+                queryset=AttributMenace.objects.select_related(
+                    'attribut_securite__actif__architecture'
+                ).only('id', 'menace', 'attribut_securite', 'probabilite', 'impact', 'cout_impact')
+            )
+        )
+    
+    def contextes_hierarchiques(self):
+        """{id menace: contexte_hierarchique_complet} en une requête pour les menaces
+        ayant un attribut principal (les autres passent par la propriété)"""
+        attr = 'attribut_securite_principal__'
+        rows = self.values_list(
+            'id', attr + 'id', attr + 'type_attribut', attr + 'priorite',
+            attr + 'actif__id', attr + 'actif__nom', attr + 'actif__criticite',
+            attr + 'actif__architecture__id', attr + 'actif__architecture__nom'
+        )
+        
+        contextes = {}
+        sans_principal = []
+        for (menace_id, attribut_id, type_attribut, priorite,
+             actif_id, actif_nom, criticite, architecture_id, architecture_nom) in rows:
+            if attribut_id is None:
+                sans_principal.append(menace_id)
+                continue
+            contextes[menace_id] = {
+                'architecture': {'id': str(architecture_id), 'nom': architecture_nom},
+                'actif': {'id': str(actif_id), 'nom': actif_nom, 'criticite': criticite},
+                'attribut_securite': {
+                    'id': str(attribut_id),
+                    'type_attribut': type_attribut,
+                    'priorite': priorite
+                }
+            }
+        
+        for menace in self.model.objects.filter(pk__in=sans_principal):
+            contextes[menace.id] = menace.contexte_hierarchique_complet
+        return contextes
+
 class Menace(BaseModel):
     """Menaces de sécurité liées aux attributs"""
     nom = models.CharField(max_length=200)
@@ -241,6 +347,8 @@ class Menace(BaseModel):
         help_text="Attribut de sécurité principal pour cette menace"
     )
     
+    objects = MenaceQuerySet.as_manager()
+    
     class Meta:
         db_table = 'menace'
         verbose_name = 'Menace'
@@ -251,16 +359,15 @@ class Menace(BaseModel):
     
     @property 
     def attribut_securite_parent_simple(self):
-        """Version alternative qui trie en Python"""
+        """Attribut principal, sinon l'attribut où le risque financier de la menace est le plus élevé"""
         if self.attribut_securite_principal:
             return self.attribut_securite_principal
         
-        attr_menaces = list(self.attributs_impactes.select_related('attribut_securite').all())
-        if not attr_menaces:
-            return None
-        
-        attr_menaces.sort(key=lambda am: am.risque_financier, reverse=True)
-        return attr_menaces[0].attribut_securite
+        # Tri par la base (probabilité × coût impact) : une seule ligne ramenée
+        top = self.attributs_impactes.select_related('attribut_securite').annotate(
+            _risque=models.F('probabilite') * models.F('cout_impact')
+        ).order_by('-_risque').first()
+        return top.attribut_securite if top else None
     
     @property
     def actif_parent(self):
@@ -319,6 +426,10 @@ class Menace(BaseModel):
     @property
     def contexte_hierarchique_complet(self):
         """Retourne le contexte hiérarchique complet"""
+        # Attribut principal non chargé : une requête pour toute la chaîne au lieu de trois
+        if self.attribut_securite_principal_id and not Menace.attribut_securite_principal.is_cached(self):
+            return Menace.objects.filter(pk=self.pk).contextes_hierarchiques().get(self.pk)
+        
         attribut = self.attribut_securite_parent_simple
         if not attribut:
             return None
@@ -340,76 +451,74 @@ class Menace(BaseModel):
             }
         }
     
+    cached_properties = ('_context_attr_menace', '_premier_attribut_impacte')
+    
+    @cached_property
+    def _context_attr_menace(self):
+        """Association AttributMenace du contexte principal (lue une fois pour toutes les propriétés)"""
+        if not self.attribut_securite_principal_id:
+            return None
+        
+        # Associations préchargées (with_context) : recherche en mémoire, sans requête
+        if 'attributs_impactes' in getattr(self, '_prefetched_objects_cache', {}):
+            return next(
+                (am for am in self.attributs_impactes.all()
+                 if am.attribut_securite_id == self.attribut_securite_principal_id),
+                None
+            )
+        
+        # Seules les colonnes lues par les propriétés de contexte sont ramenées
+        return self.attributs_impactes.filter(
+            attribut_securite_id=self.attribut_securite_principal_id
+        ).only('id', 'probabilite', 'impact', 'cout_impact').first()
+    
+    @cached_property
+    def _premier_attribut_impacte(self):
+        """Attribut de la première association (ordre des pk), avec actif et architecture"""
+        # Associations préchargées (with_context) : recherche en mémoire, sans requête
+        if 'attributs_impactes' in getattr(self, '_prefetched_objects_cache', {}):
+            attr_menace = min(self.attributs_impactes.all(), key=lambda am: am.pk, default=None)
+        else:
+            attr_menace = self.attributs_impactes.select_related(
+                'attribut_securite__actif__architecture'
+            ).order_by('pk').first()
+        
+        return attr_menace.attribut_securite if attr_menace else None
+    
     @property
     def risque_financier_dans_contexte(self):
         """Risque financier de cette menace dans le contexte principal"""
-        if not self.attribut_securite_principal:
-            return 0
-        
-        attr_menace = self.attributs_impactes.filter(
-            attribut_securite=self.attribut_securite_principal
-        ).first()
-        
+        attr_menace = self._context_attr_menace
         return attr_menace.risque_financier if attr_menace else 0
     
     @property
     def probabilite(self):
         """Probabilité dans le contexte principal"""
-        if not self.attribut_securite_principal:
-            return None
-        
-        attr_menace = self.attributs_impactes.filter(
-            attribut_securite=self.attribut_securite_principal
-        ).first()
-        
+        attr_menace = self._context_attr_menace
         return attr_menace.probabilite if attr_menace else None
     
     @property
     def impact(self):
         """Impact dans le contexte principal"""
-        if not self.attribut_securite_principal:
-            return None
-        
-        attr_menace = self.attributs_impactes.filter(
-            attribut_securite=self.attribut_securite_principal
-        ).first()
-        
+        attr_menace = self._context_attr_menace
         return attr_menace.impact if attr_menace else None
     
     @property
     def cout_impact(self):
         """Coût d'impact dans le contexte principal"""
-        if not self.attribut_securite_principal:
-            return None
-        
-        attr_menace = self.attributs_impactes.filter(
-            attribut_securite=self.attribut_securite_principal
-        ).first()
-        
+        attr_menace = self._context_attr_menace
         return attr_menace.cout_impact if attr_menace else None
     
     @property
     def niveau_risque_calculated(self):
         """Niveau de risque calculé dans le contexte principal"""
-        if not self.attribut_securite_principal:
-            return None
-        
-        attr_menace = self.attributs_impactes.filter(
-            attribut_securite=self.attribut_securite_principal
-        ).first()
-        
+        attr_menace = self._context_attr_menace
         return attr_menace.niveau_risque if attr_menace else None
     
     @property
     def risque_financier_calculated(self):
         """Risque financier calculé dans le contexte principal"""
-        if not self.attribut_securite_principal:
-            return None
-        
-        attr_menace = self.attributs_impactes.filter(
-            attribut_securite=self.attribut_securite_principal
-        ).first()
-        
+        attr_menace = self._context_attr_menace
         return attr_menace.risque_financier if attr_menace else None
 
 class AttributMenace(BaseModel):
@@ -437,26 +546,47 @@ class AttributMenace(BaseModel):
         default=Decimal('0.00'),
         help_text="Coût financier estimé de l'impact"
     )
+    # Risque financier stocké par PostgreSQL (colonne générée) : les SUM portent sur une
+    # seule colonne au lieu de recalculer le produit ligne par ligne
+    risque_financier_stored = models.GeneratedField(
+        expression=models.F('probabilite') * models.F('cout_impact') / 100,
+        output_field=models.DecimalField(max_digits=20, decimal_places=6),
+        db_persist=True
+    )
     
-    @property
+    cached_properties = ('niveau_risque', 'risque_financier')
+    
+    @cached_property
     def niveau_risque(self):
         """Calcule le niveau de risque : Probabilité × Impact"""
-        probabilite = self.probabilite if self.probabilite is not None else Decimal('0.00')
-        impact = self.impact if self.impact is not None else Decimal('0.00')
-        return float((probabilite * impact) / 100)
+        # Conversion en float une fois par champ : le résultat est un float de toute façon
+        probabilite = float(self.probabilite or 0)
+        impact = float(self.impact or 0)
+        return (probabilite * impact) / 100
     
-    @property
+    @cached_property
     def risque_financier(self):
         """Calcule le risque financier : Probabilité × Coût Impact"""
-        probabilite = self.probabilite if self.probabilite is not None else Decimal('0.00')
-        cout_impact = self.cout_impact if self.cout_impact is not None else Decimal('0.00')
-        return float((probabilite / 100) * cout_impact)
+        probabilite = float(self.probabilite or 0)
+        cout_impact = float(self.cout_impact or 0)
+        return (probabilite / 100) * cout_impact
     
     class Meta:
         db_table = 'attribut_menace'
         verbose_name = 'Attribut-Menace'
         verbose_name_plural = 'Attributs-Menaces'
-        unique_together = ['attribut_securite', 'menace']
+        constraints = [
+            models.UniqueConstraint(fields=['attribut_securite', 'menace'], name='uq_attr_menace_attr_menace'),
+        ]
+        indexes = [
+            models.Index(fields=['-probabilite'], name='attr_menace_proba_desc_idx'),
+            # Index couvrant pour SUM(risque_financier_stored) par attribut : parcours index-only
+            models.Index(
+                fields=['attribut_securite'],
+                include=['risque_financier_stored'],
+                name='attr_menace_secu_rf_idx'
+            ),
+        ]
     
     def __str__(self):
         return f"{self.attribut_securite} → {self.menace.nom}"
@@ -488,6 +618,10 @@ class ControleNIST(BaseModel):
         db_table = 'controle_nist'
         verbose_name = 'Contrôle NIST'
         verbose_name_plural = 'Contrôles NIST'
+        indexes = [
+            # Recherche admin par similarité trigramme sur nom (ControleNISTAdmin.get_search_results)
+            GinIndex(fields=['nom'], opclasses=['gin_trgm_ops'], name='controle_nist_nom_trgm_idx'),
+        ]
     
     def __str__(self):
         return f"{self.code} - {self.nom}"
@@ -522,7 +656,9 @@ class MenaceControle(BaseModel):
         db_table = 'menace_controle'
         verbose_name = 'Menace-Contrôle'
         verbose_name_plural = 'Menaces-Contrôles'
-        unique_together = ['menace', 'controle_nist']
+        constraints = [
+            models.UniqueConstraint(fields=['menace', 'controle_nist'], name='uq_menace_ctrl_menace_ctrl'),
+        ]
     
     def __str__(self):
         return f"{self.menace.nom} → {self.controle_nist.code}"
@@ -564,10 +700,28 @@ class Technique(BaseModel):
         db_table = 'technique'
         verbose_name = 'Technique'
         verbose_name_plural = 'Techniques'
+        indexes = [
+            models.Index(fields=['controle_nist', 'nom'], name='technique_ctrl_nom_idx'),
+            # Recherche admin par similarité trigramme sur nom (TechniqueAdmin.get_search_results)
+            GinIndex(fields=['nom'], opclasses=['gin_trgm_ops'], name='technique_nom_trgm_idx'),
+            # Techniques sans code, dans l'ordre de numérotation de populate_technique_codes
+            models.Index(
+                fields=['controle_nist', 'created_at'],
+                condition=models.Q(technique_code__isnull=True),
+                name='technique_pending_code_idx'
+            ),
+        ]
     
     def __str__(self):
         return f"{self.technique_code} - {self.nom}"
 
+class MesureDeControleQuerySet(models.QuerySet):
+    def with_total_3y(self):
+        """Annote le coût total sur 3 ans, calculé par la base (lu par cout_total_3_ans)"""
+        return self.annotate(
+            _cout_total_3_ans=models.F('cout_mise_en_oeuvre') + models.F('cout_maintenance_annuel') * 3
+        )
+
 class MesureDeControle(BaseModel):
     """Mesures de contrôle concrètes pour implémenter une technique"""
     technique = models.ForeignKey(Technique, on_delete=models.CASCADE, related_name='mesures_controle')
@@ -621,17 +775,29 @@ class MesureDeControle(BaseModel):
         help_text="Description des ressources humaines/techniques nécessaires"
     )
     
+    objects = MesureDeControleQuerySet.as_manager()
+    
     class Meta:
         db_table = 'mesure_de_controle'
         verbose_name = 'Mesure de contrôle'
         verbose_name_plural = 'Mesures de contrôle'
+        indexes = [
+            models.Index(fields=['technique', 'nom'], name='mesure_tech_nom_idx'),
+        ]
     
     def __str__(self):
         return f"{self.technique.controle_nist.code} - {self.nom}"
     
-    @property
+    # L'annotation de with_total_3y() est aussi retirée : elle serait périmée après save()
+    cached_properties = ('cout_total_3_ans', '_cout_total_3_ans')
+    
+    @cached_property
     def cout_total_3_ans(self):
         """Calcule le coût total sur 3 ans"""
+        total = self.__dict__.get('_cout_total_3_ans')
+        if total is not None:
+            return float(total)
+        
         cout_mise_en_oeuvre = self.cout_mise_en_oeuvre if self.cout_mise_en_oeuvre is not None else Decimal('0.00')
         cout_maintenance_annuel = self.cout_maintenance_annuel if self.cout_maintenance_annuel is not None else Decimal('0.00')
         return float(cout_mise_en_oeuvre + (cout_maintenance_annuel * 3))
@@ -691,7 +857,14 @@ class ImplementationMesure(BaseModel):
         db_table = 'implementation_mesure'
         verbose_name = 'Implémentation de mesure'
         verbose_name_plural = 'Implémentations de mesures'
-        unique_together = ['attribut_menace', 'mesure_controle']
+        constraints = [
+            models.UniqueConstraint(fields=['attribut_menace', 'mesure_controle'], name='uq_impl_mesure_attr_mesure'),
+        ]
+        indexes = [
+            models.Index(fields=['-created_at'], name='impl_mesure_created_desc_idx'),
+            models.Index(fields=['date_fin_prevue'], name='impl_mesure_date_fin_idx'),
+            models.Index(fields=['statut', '-created_at'], name='impl_mesure_statut_created_idx'),
+        ]
     
     def __str__(self):
         return f"{self.mesure_controle.nom} → {self.attribut_menace}"
@@ -709,4 +882,9 @@ class LogActivite(BaseModel):
         db_table = 'log_activite'
         verbose_name = 'Log d\'activité'
         verbose_name_plural = 'Logs d\'activité'
-        ordering = ['-created_at']
\ No newline at end of file
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['-created_at'], name='log_act_created_desc_idx'),
+            models.Index(fields=['action', '-created_at'], name='log_act_action_created_idx'),
+            models.Index(fields=['objet_type', '-created_at'], name='log_act_objtype_created_idx'),
+        ]
\ No newline at end of file
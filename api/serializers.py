@@ -412,12 +412,9 @@ class MenaceSerializer(serializers.ModelSerializer):
     
     def _get_attribut_principal(self, obj):
         """Méthode helper pour récupérer l'attribut principal"""
-        # Prendre le premier attribut associé (par ordre de création ou d'importance)
-        attr_menace = obj.attributs_impactes.select_related(
-            'attribut_securite__actif__architecture'
-        ).first()
-        
-        return attr_menace.attribut_securite if attr_menace else None
+        # Premier attribut associé, calculé une fois par menace (cache préchargé par
+        # Menace.objects.with_context() si présent, sinon une requête select_related)
+        return obj._premier_attribut_impacte
     
     def get_architecture_id(self, obj):
         attribut = self._get_attribut_principal(obj)
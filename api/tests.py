@@ -1,3 +1,211 @@
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.paginator import EmptyPage
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from api.admin import LogActiviteAdmin, _EstimatedCountPaginator
+from api.models import (
+    Actif, Architecture, AttributMenace, AttributSecurite, CategorieActif, ControleNIST,
+    LogActivite, Menace, MenaceControle, MesureDeControle, Technique, TypeActif
+)
+
+
+class QuickSetupCommandTest(TestCase):
+    """Relance de quick_setup sur une base déjà peuplée"""
+
+    # Paires (menace, contrôle) déclarées par create_menace_controles
+    MENACE_CONTROLES = {
+        ('Ransomware', 'SI-3'), ('Ransomware', 'CP-9'), ('Ransomware', 'AC-3'),
+        ('Attaque DDoS', 'SC-7'), ('Attaque DDoS', 'SI-4'),
+        ('Phishing', 'SI-3'), ('Phishing', 'AC-2'), ('Phishing', 'SI-4'),
+        ('Injection SQL', 'SC-7'), ('Injection SQL', 'SI-4'), ('Injection SQL', 'AC-3'),
+        ('Vol de données', 'AC-2'), ('Vol de données', 'AC-3'), ('Vol de données', 'SI-4'),
+        ('Panne matérielle', 'CP-9'), ('Panne matérielle', 'SI-4'),
+    }
+
+    def _run(self):
+        call_command('quick_setup', stdout=StringIO())
+
+    def _menace_controles(self):
+        return set(MenaceControle.objects.values_list('menace__nom', 'controle_nist__code'))
+
+    def test_rerun_is_idempotent_on_reference_data(self):
+        self._run()
+        self.assertEqual(User.objects.count(), 3)
+        self.assertEqual(Technique.objects.count(), 17)
+        self.assertEqual(MenaceControle.objects.count(), 16)
+        self.assertEqual(AttributMenace.objects.count(), 45)
+        self.assertEqual(self._menace_controles(), self.MENACE_CONTROLES)
+
+        self._run()
+        # Utilisateurs, menaces et contrôles réutilisés ; les techniques et les actifs
+        # (donc leurs associations) sont recréés à chaque chargement
+        self.assertEqual(User.objects.count(), 3)
+        self.assertEqual(Technique.objects.count(), 34)
+        self.assertEqual(AttributMenace.objects.count(), 90)
+        # ignore_conflicts ne doit ni dupliquer ni perdre de lien menace-contrôle
+        self.assertEqual(MenaceControle.objects.count(), 16)
+        self.assertEqual(self._menace_controles(), self.MENACE_CONTROLES)
+
+
+class PopulateTechniqueCodesCommandTest(TestCase):
+    """Numérotation des techniques sans code par populate_technique_codes"""
+
+    def setUp(self):
+        self.controle = ControleNIST.objects.create(code='AC-2', nom='Gestion des comptes', famille='AC')
+        for code in ('AC-2.1', 'AC-2.5'):
+            self._technique(code)
+        self.sans_code = self._technique(None)
+
+    def _technique(self, code):
+        return Technique.objects.create(
+            controle_nist=self.controle,
+            technique_code=code,
+            nom=f'Technique {code}',
+            description='Description',
+            type_technique='TECHNIQUE'
+        )
+
+    def test_numbering_continues_after_highest_suffix(self):
+        # Trou entre .1 et .5 : la numérotation reprend après le plus grand suffixe
+        call_command('populate_technique_codes', stdout=StringIO())
+        self.sans_code.refresh_from_db()
+        self.assertEqual(self.sans_code.technique_code, 'AC-2.6')
+
+    def test_dry_run_writes_nothing(self):
+        updated_at = self.sans_code.updated_at
+        out = StringIO()
+        call_command('populate_technique_codes', '--dry-run', stdout=out)
+        self.sans_code.refresh_from_db()
+        self.assertIsNone(self.sans_code.technique_code)
+        self.assertEqual(self.sans_code.updated_at, updated_at)
+        self.assertEqual(
+            sorted(Technique.objects.exclude(technique_code=None).values_list('technique_code', flat=True)),
+            ['AC-2.1', 'AC-2.5']
+        )
+        self.assertIn('AC-2.6', out.getvalue())
+
+
+class EstimatedCountPaginatorTest(TestCase):
+    """Listes admin paginées sur un nombre de lignes estimé"""
+
+    def setUp(self):
+        LogActivite.objects.bulk_create([
+            LogActivite(action='TEST', objet_type='Test', objet_id=str(i)) for i in range(5)
+        ])
+
+    def _paginator(self):
+        return _EstimatedCountPaginator(LogActivite.objects.order_by('-created_at', 'pk'), 2)
+
+    def test_bounded_count_is_exact(self):
+        paginator = self._paginator()
+        self.assertEqual(paginator.count, 5)
+        self.assertFalse(paginator.is_estimated)
+
+    @mock.patch.object(_EstimatedCountPaginator, 'EXACT_COUNT_LIMIT', 3)
+    def test_estimated_count_above_limit(self):
+        paginator = self._paginator()
+        # Table jamais analysée (reltuples à -1 ou 0) : au moins le COUNT borné
+        self.assertGreaterEqual(paginator.count, 4)
+        self.assertTrue(paginator.is_estimated)
+        # Dernière page réelle, au-delà d'une estimation trop basse
+        page = paginator.page(3)
+        self.assertEqual(page.number, 3)
+        self.assertEqual(len(page.object_list), 1)
+
+    @mock.patch.object(_EstimatedCountPaginator, 'EXACT_COUNT_LIMIT', 3)
+    def test_out_of_range_page_raises_empty_page(self):
+        paginator = self._paginator()
+        self.assertTrue(paginator.is_estimated)
+        with self.assertRaises(EmptyPage):
+            paginator.page(9999)
+        # Le nombre exact a remplacé l'estimation
+        self.assertFalse(paginator.is_estimated)
+        self.assertEqual(paginator.count, 5)
+
+    @mock.patch.object(LogActiviteAdmin, 'list_per_page', 2)
+    @mock.patch.object(_EstimatedCountPaginator, 'EXACT_COUNT_LIMIT', 3)
+    def test_changelist_pages(self):
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'admin'))
+        url = reverse('admin:api_logactivite_changelist')
+
+        response = self.client.get(url, {'p': 3})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['cl'].result_count, 5)
+
+        # Page inexistante : redirection habituelle de l'admin, pas d'erreur 500
+        for page in (4, 9999):
+            response = self.client.get(url, {'p': page})
+            self.assertRedirects(response, url + '?e=1', fetch_redirect_response=False)
+
+
+class MesureDeControleAdminTest(TestCase):
+    """Liste admin des mesures : nombre de requêtes indépendant du nombre de lignes"""
+
+    def setUp(self):
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'admin'))
+        self.url = reverse('admin:api_mesuredecontrole_changelist')
+
+    def _add_mesure(self, i):
+        controle = ControleNIST.objects.create(code=f'AC-{i}', nom=f'Contrôle {i}', famille='AC')
+        technique = Technique.objects.create(
+            controle_nist=controle, nom=f'Technique {i}', description='Description',
+            type_technique='TECHNIQUE'
+        )
+        MesureDeControle.objects.create(technique=technique, nom=f'Mesure {i}', description='Description')
+
+    def _changelist_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.client.get(self.url).status_code, 200)
+        return len(queries)
+
+    def test_changelist_queries_do_not_grow_with_rows(self):
+        self._add_mesure(1)
+        one_row = self._changelist_queries()
+        for i in range(2, 6):
+            self._add_mesure(i)
+        # str(obj) de la case à cocher lit technique.controle_nist, joint par list_select_related
+        self.assertEqual(self._changelist_queries(), one_row)
+
+
+class AttributSecuriteAlerteTest(TestCase):
+    """Niveau d'alerte : with_alerte() (SQL) et niveau_alerte (Python) classent pareil"""
+
+    # (coût de compromission, coût d'impact) : le ratio tombe sur chaque seuil et juste en dessous
+    CAS = [
+        (10000, 0), (10000, 3999), (10000, 4000), (10000, 6999), (10000, 7000),
+        (10000, 9999), (10000, 10000), (10000, 15000), (0, 5000),
+    ]
+
+    def setUp(self):
+        categorie = CategorieActif.objects.create(code='INFRA', nom='Infrastructure')
+        type_actif = TypeActif.objects.create(categorie=categorie, code='SRV', nom='Serveur')
+        architecture = Architecture.objects.create(nom='Test', description='Test')
+        menace = Menace.objects.create(nom='Ransomware', type_menace='Tampering', severite='ELEVE')
+        for i, (cout_compromission, cout_impact) in enumerate(self.CAS):
+            actif = Actif.objects.create(nom=f'Actif {i}', type_actif=type_actif, architecture=architecture)
+            attribut = AttributSecurite.objects.create(
+                actif=actif, type_attribut='CONFIDENTIALITE',
+                cout_compromission=Decimal(cout_compromission)
+            )
+            # Probabilité 100 % : risque financier = coût d'impact
+            AttributMenace.objects.create(
+                attribut_securite=attribut, menace=menace,
+                probabilite=Decimal('100'), cout_impact=Decimal(cout_impact)
+            )
 
-# Create your tests here.
+    def test_sql_levels_match_python_thresholds(self):
+        sql = {a.pk: a.niveau_alerte for a in AttributSecurite.objects.with_alerte()}
+        python = {a.pk: a.niveau_alerte for a in AttributSecurite.objects.all()}
+        self.assertEqual(sql, python)
+        self.assertEqual(
+            sorted(python.values()),
+            sorted(['FAIBLE', 'FAIBLE', 'MOYEN', 'MOYEN', 'ELEVE', 'ELEVE', 'CRITIQUE', 'CRITIQUE', 'FAIBLE'])
+        )
@@ -5,7 +5,7 @@ from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from django_filters.rest_framework import DjangoFilterBackend
 from django.contrib.auth.models import User
-from django.db.models import Count, Sum, Avg, Q
+from django.db.models import Count, Sum, Avg, Prefetch, Q
 from django.utils import timezone
 from decimal import Decimal
 from django.db import transaction        
@@ -1038,7 +1038,14 @@ class ArchitectureViewSet(viewsets.ModelViewSet):
 
 class ActifViewSet(viewsets.ModelViewSet):
     """Gestion des actifs"""
-    queryset = Actif.objects.select_related('type_actif', 'architecture', 'proprietaire').all()
+    queryset = Actif.objects.select_related('type_actif', 'architecture', 'proprietaire').prefetch_related(
+        'attributs_securite',
+        # risque_financier_attribut ne lit que probabilité et coût impact des menaces
+        Prefetch(
+            'attributs_securite__menaces',
+            queryset=AttributMenace.objects.only('id', 'attribut_securite_id', 'probabilite', 'cout_impact')
+        )
+    )
     permission_classes = [IsAuthenticated]
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     filterset_fields = ['type_actif', 'architecture', 'criticite', 'proprietaire']
@@ -1176,7 +1183,7 @@ class ActifViewSet(viewsets.ModelViewSet):
 
 class AttributSecuriteViewSet(viewsets.ModelViewSet):
     """Gestion des attributs de sécurité"""
-    queryset = AttributSecurite.objects.select_related('actif').all()
+    queryset = AttributSecurite.objects.with_alerte().select_related('actif')
     permission_classes = [IsAuthenticated]
     filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
     filterset_fields = ['actif', 'type_attribut', 'priorite']
@@ -2461,7 +2468,7 @@ class TechniqueViewSet(viewsets.ModelViewSet):
 
 class MesureDeControleViewSet(viewsets.ModelViewSet):
     """Gestion des mesures de contrôle"""
-    queryset = MesureDeControle.objects.select_related('technique', 'technique__controle_nist').all()
+    queryset = MesureDeControle.objects.with_total_3y().select_related('technique', 'technique__controle_nist')
     permission_classes = [IsAuthenticated]
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     filterset_fields = ['technique', 'nature_mesure']
@@ -3092,11 +3099,10 @@ class TypeActifViewSet(viewsets.ModelViewSet):
 
 class MenaceViewSet(viewsets.ModelViewSet):
     """Catalogue global des menaces avec vue consolidée"""
-    # Optimiser le queryset pour précharger les relations nécessaires
-    queryset = Menace.objects.prefetch_related(
-        'attributs_impactes__attribut_securite__actif__architecture',
+    # Contexte (FK en JOIN, associations en Prefetch) puis contrôles → techniques → mesures
+    queryset = Menace.objects.with_context().prefetch_related(
         'controles_nist__controle_nist__techniques__mesures_controle'
-    ).all().order_by('nom')
+    ).order_by('nom')
     
     permission_classes = [IsAuthenticated]
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]